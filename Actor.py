@@ -9,25 +9,86 @@
 #
 
 
+class _ManagedField:
+    """Descriptor for a value which is stored in one of the ActorManager's
+    arrays rather than on the actor itself.  Reading or writing the attribute
+    on the actor reads or writes the actor's slot in the array"""
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, actor, owner=None):
+        if actor is None:
+            return self
+        # item() gives us a plain Python value without building a NumPy
+        # scalar first, which matters as actor code reads these a lot
+        return getattr(actor.manager, self.name).item(actor.slot)
+
+    def __set__(self, actor, value):
+        getattr(actor.manager, self.name)[actor.slot] = value
+
+
 class Actor:
+    # Actors are created in large numbers, so we don't give them a __dict__.
+    # Subclasses should declare __slots__ too (an empty tuple if they have
+    # no attributes of their own) or they'll get one back
+    __slots__ = ("manager", "slot", "visible", "dying", "tag", "id")
+
+    # The attributes (besides the ones in the manager's arrays) which make up
+    # the actor's state in a snapshot, with their struct format codes.
+    # Subclasses with state of their own should add theirs to these
+    snapshot_attributes = (("visible", "?"), ("dying", "?"))
+
+    # Swept actors aren't simply moved and then checked for overlaps.  The
+    # manager moves them along their path, stopping wherever they touch a
+    # solid actor to call on_collide() on both, then carrying on for the
+    # rest of the tick, so however fast they go they can't pass through
+    # anything.  Worth it for a few small, fast actors (the ball)
+    swept = False
+
+    # The kinematics of each actor live in the manager's arrays so that the
+    # manager can move every actor at once.  These make them look like
+    # ordinary attributes.  Direction and heading are in degrees, measured
+    # anticlockwise from the positive x axis.  The actor's bounding box for
+    # collisions has its top left corner at (x, y)
+    x = _ManagedField("x")
+    y = _ManagedField("y")
+    width = _ManagedField("width")
+    height = _ManagedField("height")
+    direction = _ManagedField("direction")
+    speed = _ManagedField("speed")
+    acceleration = _ManagedField("acceleration")
+    heading = _ManagedField("heading")
+    active = _ManagedField("active")
+    solid = _ManagedField("solid")
+
     def __init__(self, manager, tag):
         """Performs any on-load initialisation of the Actor such as defining
         sensible defaults for any instance level variables"""
+        self.manager = manager
+        self.slot = manager.allocate_slot(self)  # Our index in the arrays
+        self.tag = tag
+        self.id = ""  # ID will be set when the object is instantiated.
+        self.reset()
+
+    def reset(self):
+        """Puts the actor back into its freshly created condition.  Called
+        when the actor is first created and whenever it's returned to the
+        manager's pool for reuse.  Subclasses with their own attributes
+        should reset those too, then call this"""
         self.x = self.y = 0
+        self.width = self.height = 0
         self.direction = self.speed = self.acceleration = 0
         self.heading = 0
-        self.manager = manager
         self.solid = self.visible = False
         self.active = self.dying = False
-        self.tag = tag
-        self.id = ""  # ID will be set when the object is instantiated.
 
     def create(self):
         """Code that executes when an instance of the object is created"""
         pass
 
     def update(self):
-        """Code that executes once per cycle through the inner game loop"""
+        """Code that executes once per cycle through the inner game loop,
+        after the manager has moved the actor"""
         pass
 
     def draw(self):
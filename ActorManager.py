@@ -4,32 +4,429 @@
 # A class to manage the object instances that will be generated as part of
 # the game code.
 #
+# The kinematics of every actor (position, direction, speed, etc.) are held
+# in a set of NumPy arrays, one array per value, indexed by the actor's slot.
+# That lets us move every active actor with a handful of array operations per
+# tick, rather than running Python code for each actor in turn, which is what
+# makes thousands of balls or particles practical.
+#
 # Author:  Mark Edwards
 # Date:    26/07/2021
 # Version: 0.01  -  Initial version
 #
+import math
+import struct
+import numpy as np
+
+from Actor import Actor
+from Collision import sweep_box
+from Snapshot import pack_attributes, unpack_attributes
+
+
 class ActorManager:
-    def __init__(self, game):
+    # The arrays holding the per-actor values, along with their types
+    FIELDS = {
+        "x": np.float64,
+        "y": np.float64,
+        "width": np.float64,
+        "height": np.float64,
+        "direction": np.float64,
+        "speed": np.float64,
+        "acceleration": np.float64,
+        "heading": np.float64,
+        "active": np.bool_,
+        "solid": np.bool_
+    }
+
+    # The number of slots held in a snapshot, which comes before the arrays
+    SNAPSHOT_HEADER = struct.Struct("<I")
+
+    def __init__(self, game, capacity=64, cell_size=64):
         self.game = game     # Reference to the main game object
         self.objects = {}    # Dictionary containing all the basic objects
-        self.instances = []  # List containing all the active actor instances
+        self.instances = {}  # All the active actor instances, keyed by id
+
+        # The instances which have their own update() code.  Kept separately
+        # so we don't have to check every instance every tick
+        self.update_hooks = {}
+
+        # The instances which are swept (see Actor.swept) rather than moved
+        # along with everything else
+        self.swept_actors = {}
+
+        # Destroyed instances waiting to be reused, as lists keyed by tag.
+        # Pooled instances keep their slot in the arrays and their id
+        self.free_instances = {}
+
+        # The actor arrays.  Slots are handed out from the front, and freed
+        # slots are reused before we grow.  Destroyed actors keep their slot
+        # while they wait in the pool
+        self.capacity = 0
+        self.slots_used = 0
+        self.free_slots = []
+        self.owners = []     # The actor object for each slot
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name, np.zeros(0, dtype))
+        self._grow(capacity)
+
+        self.next_id = 0
+
+        # Collision detection.  Solid actors are sorted into a grid of
+        # cell_size square cells, and only actors which share a cell are
+        # tested against each other
+        self.cell_size = cell_size
+        self.collision_stats = {"solid": 0, "candidates": 0, "hits": 0,
+                                "swept_hits": 0}
+
+        # The most times a swept actor can hit something in a single tick.
+        # It simply carries on through anything after that
+        self.max_swept_hits = 8
 
     def load_objects(self, objects):
         """Initialisation function.  Discards the current set of instantiable
-        objects and allows us to specify a new set"""
-        pass
+        objects and allows us to specify a new set
+
+        Parameters
+        ----------
+        objects : dict
+            Maps the tag of each object to the Actor subclass to create
+        """
+        for instance in list(self.instances.values()):
+            self.destroy_instance(instance)
+
+        # The pooled instances may belong to classes we no longer use
+        for pool in self.free_instances.values():
+            for instance in pool:
+                self.release_slot(instance.slot)
+        self.free_instances = {}
+
+        self.objects = dict(objects)
+
+    def prewarm(self, tag, count):
+        """Creates instances of the given object up front and puts them in
+        the pool, so that creating that many instances later during play
+        doesn't allocate anything"""
+        pool = self.free_instances.setdefault(tag, [])
+        for _ in range(count):
+            pool.append(self._new_instance(tag))
 
     def create_instance(self, tag):
-        """Creates a new instance of an Actor"""
-        pass
+        """Creates a new instance of an Actor, reusing a destroyed instance
+        with the same tag if there is one"""
+        pool = self.free_instances.get(tag)
+        instance = pool.pop() if pool else self._new_instance(tag)
+
+        instance.active = True
+        self._enlist(instance)
+        instance.create()
+        return instance
 
     def destroy_instance(self, instance):
-        """Destroys an instance of an Actor"""
-        pass
+        """Destroys an instance of an Actor.  The instance is reset and kept
+        to be handed out again by create_instance()"""
+        instance.die()
+        self._retire(instance)
+
+    def snapshot(self):
+        """Returns the state of every actor as bytes: which slots hold live
+        actors, the contents of the arrays, then the snapshot_attributes of
+        each live actor"""
+        n = self.slots_used
+        live = self._live_mask()
+        parts = [self.SNAPSHOT_HEADER.pack(n), np.packbits(live).tobytes()]
+        parts.extend(getattr(self, name)[:n].tobytes() for name in self.FIELDS)
+        parts.extend(pack_attributes(self.owners[slot])
+                     for slot in np.flatnonzero(live))
+        return b"".join(parts)
+
+    def restore(self, data, offset=0):
+        """Puts every actor back as it was when snapshot() returned data,
+        starting at the given offset into it.  Actors created since are
+        returned to the pool, and those destroyed since are brought back
+        (without their create() code being run again).  Returns the offset
+        of the first byte after the actors' data"""
+        n, = self.SNAPSHOT_HEADER.unpack_from(data, offset)
+        offset += self.SNAPSHOT_HEADER.size
+        if n > self.slots_used:
+            raise ValueError(f"Snapshot has {n} actor slots, but only "
+                             f"{self.slots_used} are in use")
+
+        live = np.zeros(self.slots_used, np.bool_)
+        live[:n] = np.unpackbits(np.frombuffer(data, np.uint8, (n + 7) // 8,
+                                               offset), count=n)
+        offset += (n + 7) // 8
+
+        # Bring the set of live actors into line with the snapshot
+        for slot in np.flatnonzero(live != self._live_mask()):
+            instance = self.owners[slot]
+            if not live[slot]:
+                self._retire(instance)
+            elif instance is None:
+                raise ValueError(f"Actor slot {slot} in the snapshot has "
+                                 f"since been released")
+            else:
+                self.free_instances[instance.tag].remove(instance)
+                self._enlist(instance)
+
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            array[:n] = np.frombuffer(data, array.dtype, n, offset)
+            offset += n * array.itemsize
+
+        for slot in np.flatnonzero(live):
+            offset = unpack_attributes(self.owners[slot], data, offset)
+        return offset
+
+    def allocate_slot(self, actor):
+        """Returns a free slot in the arrays for the given actor, growing the
+        arrays if they're full"""
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.slots_used == self.capacity:
+                self._grow(max(1, self.capacity * 2))
+            slot = self.slots_used
+            self.slots_used += 1
+
+        self.owners[slot] = actor
+        return slot
+
+    def release_slot(self, slot):
+        """Marks a slot as free so it can be given to a new actor"""
+        for name in self.FIELDS:
+            getattr(self, name)[slot] = 0
+        self.owners[slot] = None
+        self.free_slots.append(slot)
+
+    def update(self, dt):
+        """Update all the active instances.  Every active actor is moved in
+        one step, then the swept actors are moved, hitting things as they
+        go.  Collisions between solid actors which overlap are dispatched,
+        then each actor's own update() code is run"""
+        n = self.slots_used
+        active = np.flatnonzero(self.active[:n])
 
-    def update(self):
-        """Update all the active instances"""
+        if len(active):
+            self.speed[active] += self.acceleration[active] * dt
+
+            moving = active
+            if self.swept_actors:
+                unswept = self.active[:n].copy()
+                unswept[[instance.slot for instance
+                         in self.swept_actors.values()]] = False
+                moving = np.flatnonzero(unswept)
+
+            # Screen y runs downwards, so a positive angle moves up the screen
+            radians = np.radians(self.direction[moving])
+            speed = self.speed[moving]
+            self.x[moving] += np.cos(radians) * speed * dt
+            self.y[moving] -= np.sin(radians) * speed * dt
+
+        swept_hits = sum([self._sweep(instance, dt)
+                          for instance in list(self.swept_actors.values())])
+
+        self.collide()
+        self.collision_stats["swept_hits"] = swept_hits
+
+        # Only call update() on actors which actually define one, since for
+        # thousands of plain actors the calls alone would cost more than
+        # moving them
+        for instance in list(self.update_hooks.values()):
+            instance.update()
+
+    def collide(self):
+        """Finds every pair of active, solid actors whose bounding boxes
+        overlap and calls on_collide() on both actors of each pair.  The
+        number of candidate pairs tested and actual hits are left in
+        collision_stats"""
+        n = self.slots_used
+        solid = np.flatnonzero(self.active[:n] & self.solid[:n])
+        self.collision_stats = {"solid": len(solid), "candidates": 0,
+                                "hits": 0, "swept_hits": 0}
+        if len(solid) < 2:
+            return
+
+        # Broadphase.  Work out which cells each actor's box covers...
+        left, top = self.x[solid], self.y[solid]
+        right, bottom = left + self.width[solid], top + self.height[solid]
+        cx0 = np.floor(left / self.cell_size).astype(np.int64)
+        cy0 = np.floor(top / self.cell_size).astype(np.int64)
+        cols = np.floor(right / self.cell_size).astype(np.int64) - cx0 + 1
+        rows = np.floor(bottom / self.cell_size).astype(np.int64) - cy0 + 1
+
+        # ...then make one (cell, actor) entry for every cell covered.  Most
+        # actors are smaller than a cell so will only have one or two
+        covered = cols * rows
+        actor = np.repeat(np.arange(len(solid)), covered)
+        within = np.arange(len(actor)) - np.repeat(np.cumsum(covered)
+                                                   - covered, covered)
+        cell_x = cx0[actor] + within % cols[actor]
+        cell_y = cy0[actor] + within // cols[actor]
+        cell = (cell_x << 32) ^ (cell_y & 0xFFFFFFFF)
+
+        # Sorting by cell puts the actors sharing a cell next to each other,
+        # so pairing each entry with the one k places after it, for each k up
+        # to the most crowded cell, gives every pair within every cell
+        order = np.argsort(cell, kind="stable")
+        cell, actor = cell[order], actor[order]
+
+        first, second = [], []
+        for k in range(1, len(cell)):
+            same = np.flatnonzero(cell[:-k] == cell[k:])
+            if not len(same):
+                break
+            first.append(actor[same])
+            second.append(actor[same + k])
+        if not first:
+            return
+
+        # Actors sharing more than one cell will have been paired up more
+        # than once, so throw away the duplicates
+        first, second = np.concatenate(first), np.concatenate(second)
+        pair = np.sort(np.minimum(first, second) * len(solid)
+                       + np.maximum(first, second))
+        pair = pair[np.r_[True, pair[1:] != pair[:-1]]]
+        first, second = pair // len(solid), pair % len(solid)
+        self.collision_stats["candidates"] = len(pair)
+
+        # Narrowphase.  Boxes which merely touch don't count as a hit
+        hit = ((left[first] < right[second]) & (left[second] < right[first])
+               & (top[first] < bottom[second]) & (top[second] < bottom[first]))
+        self.collision_stats["hits"] = int(np.count_nonzero(hit))
+
+        for a, b in zip(solid[first[hit]], solid[second[hit]]):
+            self.owners[a].on_collide(self.owners[b])
+            self.owners[b].on_collide(self.owners[a])
 
     def draw(self):
         """Draw all the active instances"""
-        pass
+        for instance in self.instances.values():
+            if instance.visible:
+                instance.draw()
+
+    def _enlist(self, instance):
+        """Private method to add an instance to the live set"""
+        self.instances[instance.id] = instance
+        if type(instance).update is not Actor.update:
+            self.update_hooks[instance.id] = instance
+        if instance.swept:
+            self.swept_actors[instance.id] = instance
+
+    def _retire(self, instance):
+        """Private method to remove an instance from the live set, reset it
+        and put it in the pool"""
+        del self.instances[instance.id]
+        self.update_hooks.pop(instance.id, None)
+        self.swept_actors.pop(instance.id, None)
+
+        instance.reset()
+        self.free_instances.setdefault(instance.tag, []).append(instance)
+
+    def _sweep(self, instance, dt):
+        """Private method to move a swept actor through a tick.  It travels
+        in a straight line until it touches a solid actor, when on_collide()
+        is called on both (which may send it off in a new direction), then
+        carries on from there for the rest of the tick.  The other actors
+        have already been moved, and are taken to have moved steadily over
+        the tick.  Returns the number of hits"""
+        if not instance.active:
+            return 0
+
+        # Where the other solid actors were at the start of the tick, how
+        # big they are and how fast they're going.  There are usually only a
+        # few, so they're checked one by one in plain Python
+        n = self.slots_used
+        others = np.flatnonzero(self.active[:n] & self.solid[:n])
+        others = others[others != instance.slot]
+        radians = np.radians(self.direction[others])
+        other_vx = np.cos(radians) * self.speed[others]
+        other_vy = -np.sin(radians) * self.speed[others]
+        others = list(zip(others.tolist(),
+                          (self.x[others] - other_vx * dt).tolist(),
+                          (self.y[others] - other_vy * dt).tolist(),
+                          self.width[others].tolist(),
+                          self.height[others].tolist(),
+                          other_vx.tolist(), other_vy.tolist()))
+
+        elapsed = 0.0
+        hits = 0
+        while instance.solid and others and hits < self.max_swept_hits:
+            x, y = instance.x, instance.y
+            width, height = instance.width, instance.height
+            radians = math.radians(instance.direction)
+            vx = math.cos(radians) * instance.speed
+            vy = -math.sin(radians) * instance.speed
+
+            time, first = math.inf, None
+            for i, (_, other_x, other_y, other_width, other_height,
+                    other_vx, other_vy) in enumerate(others):
+                hit_time = sweep_box(x, y, width, height, vx - other_vx,
+                                     vy - other_vy,
+                                     other_x + other_vx * elapsed,
+                                     other_y + other_vy * elapsed,
+                                     other_width, other_height, dt - elapsed)
+                if hit_time < time:
+                    time, first = hit_time, i
+            if first is None:
+                break
+
+            # Move up to the point of contact and let them both react.  The
+            # other actor is put back where it was at the moment of contact
+            # while they do, then moved on again
+            instance.x = x + vx * time
+            instance.y = y + vy * time
+            elapsed += time
+            hits += 1
+
+            slot, _, _, _, _, other_vx, other_vy = others[first]
+            other = self.owners[slot]
+            rewind_x = other_vx * (dt - elapsed)
+            rewind_y = other_vy * (dt - elapsed)
+            other.x -= rewind_x
+            other.y -= rewind_y
+            course = (instance.direction, instance.speed)
+            instance.on_collide(other)
+            other.on_collide(instance)
+            other.x += rewind_x
+            other.y += rewind_y
+
+            # If the hit didn't change our course, then we'd only hit the
+            # same thing again straight away, so ignore it from now on
+            if (instance.direction, instance.speed) == course:
+                del others[first]
+
+        # Then whatever's left of the tick, without stopping
+        radians = math.radians(instance.direction)
+        instance.x += math.cos(radians) * instance.speed * (dt - elapsed)
+        instance.y -= math.sin(radians) * instance.speed * (dt - elapsed)
+        return hits
+
+    def _live_mask(self):
+        """Private method returning an array saying which of the slots in
+        use hold live actors"""
+        live = np.zeros(self.slots_used, np.bool_)
+        live[[instance.slot for instance in self.instances.values()]] = True
+        return live
+
+    def _new_instance(self, tag):
+        """Private method to construct a brand new instance of an object.
+        The id is given out here and stays with the instance for good, even
+        when it's pooled and reused"""
+        instance = self.objects[tag](self, tag)
+        instance.id = f"{tag}{self.next_id}"
+        self.next_id += 1
+        return instance
+
+    def _grow(self, capacity):
+        """Private method to enlarge the arrays to hold at least the given
+        number of actors"""
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+
+        for name, dtype in self.FIELDS.items():
+            setattr(self, name,
+                    np.concatenate((getattr(self, name),
+                                    np.zeros(extra, dtype))))
+        self.owners.extend([None] * extra)
+        self.capacity = capacity
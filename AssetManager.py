@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+
+# AssetManager.py
+# Loads and caches the game's assets.  Each asset is only decoded from disk
+# once, and images are converted to the display's pixel format as they are
+# loaded so that blitting them is as cheap as possible.  Assets are reference
+# counted; ones which nobody is using stay cached until the memory budget is
+# exceeded, at which point the least recently used are evicted.  Assets can
+# also be preloaded in a background thread so that a state never has to wait
+# on the disk when it starts up.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+from collections import OrderedDict
+import threading
+import pygame
+
+
+class AssetManager:
+    def __init__(self, budget=64 * 1024 * 1024):
+        """Initialises an empty asset cache.
+
+        Parameters
+        ----------
+        budget : int
+            The number of bytes of unreferenced assets we'll keep hold of
+            before evicting them.  Assets which are in use are never evicted
+        """
+        self.budget = budget
+
+        # Loaded assets, keyed on (kind, path, options).  Each entry is a
+        # dictionary holding the asset, its reference count and its size
+        self.assets = OrderedDict()
+        self.resident_bytes = 0
+
+        # Assets which have been decoded by the background loader, but not
+        # yet converted, along with an Event for each path still in flight
+        self._decoded = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def get_image(self, path, alpha=False, size=None):
+        """Returns the image at the given path, converted to the display
+        format, and adds a reference to it.  Every call must be matched by a
+        call to release_image() once the image is no longer needed
+
+        Parameters
+        ----------
+        path : str
+            The filename of the image
+        alpha : bool
+            Whether the image has per-pixel alpha which needs keeping
+        size : tuple
+            The (width, height) to scale the image to, if it isn't already
+            that size.  Each size is cached separately
+        """
+        key = ("image", path, alpha, size)
+        entry = self.assets.get(key)
+        if entry is None:
+            image = self._decode_image(path)
+            image = image.convert_alpha() if alpha else image.convert()
+            if size is not None and image.get_size() != tuple(size):
+                image = pygame.transform.smoothscale(image, size)
+            entry = {"asset": image, "refs": 0,
+                     "bytes": image.get_pitch() * image.get_height()}
+            self.assets[key] = entry
+            self.resident_bytes += entry["bytes"]
+            self.loads += 1
+        else:
+            self.hits += 1
+            self.assets.move_to_end(key)
+
+        entry["refs"] += 1
+        return entry["asset"]
+
+    def release_image(self, path, alpha=False, size=None, evict=False):
+        """Drops a reference to an image obtained from get_image().  The
+        image stays cached until it's evicted to stay within the budget, or
+        if evict is True, is evicted straight away once nobody is using
+        it"""
+        key = ("image", path, alpha, size)
+        entry = self.assets.get(key)
+        if entry is not None and entry["refs"] > 0:
+            entry["refs"] -= 1
+            if evict and entry["refs"] == 0:
+                del self.assets[key]
+                self.resident_bytes -= entry["bytes"]
+                self.evictions += 1
+            self._enforce_budget()
+
+    def preload_images(self, paths):
+        """Decodes the given images in a background thread, so that a later
+        get_image() doesn't have to touch the disk.  Returns the thread"""
+        with self._lock:
+            paths = [p for p in paths
+                     if p not in self._decoded and p not in self._pending
+                     and not any(key[1] == p for key in self.assets)]
+            for path in paths:
+                self._pending[path] = threading.Event()
+
+        def load():
+            for path in paths:
+                try:
+                    image = pygame.image.load(path)
+                except (pygame.error, FileNotFoundError):
+                    # Leave it to get_image() to report the error when the
+                    # image is actually needed
+                    image = None
+                with self._lock:
+                    if image is not None:
+                        self._decoded[path] = image
+                    self._pending.pop(path).set()
+
+        thread = threading.Thread(target=load, name="AssetPreload",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def set_budget(self, budget):
+        """Changes the memory budget, evicting straight away if needed"""
+        self.budget = budget
+        self._enforce_budget()
+
+    def _decode_image(self, path):
+        """Private method returning the decoded (but not converted) image,
+        either from the background loader or straight from disk"""
+        with self._lock:
+            pending = self._pending.get(path)
+        if pending is not None:
+            pending.wait()
+
+        with self._lock:
+            image = self._decoded.pop(path, None)
+        if image is None:
+            image = pygame.image.load(path)
+        return image
+
+    def _enforce_budget(self):
+        """Private method to evict the least recently used assets which
+        aren't in use until we're back within budget"""
+        for key in list(self.assets):
+            if self.resident_bytes <= self.budget:
+                break
+            entry = self.assets[key]
+            if entry["refs"] == 0:
+                del self.assets[key]
+                self.resident_bytes -= entry["bytes"]
+                self.evictions += 1
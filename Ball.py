@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+
+# Ball.py
+# The ball.  The ActorManager sweeps it along its path each tick (see
+# Actor.swept), so it can't skip through a paddle or wall however fast it
+# goes; the ball's own code bounces it off whatever it hits.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import math
+from Actor import Actor
+
+
+class Ball(Actor):
+    __slots__ = ("bounces", "top_limit", "bottom_limit", "max_speed",
+                 "speed_up", "max_angle")
+    snapshot_attributes = Actor.snapshot_attributes + (
+        ("bounces", "i"), ("top_limit", "d"), ("bottom_limit", "d"),
+        ("max_speed", "d"), ("speed_up", "d"), ("max_angle", "d"))
+    swept = True
+
+    def reset(self):
+        """Puts the ball back into its freshly created condition"""
+        super().reset()
+        self.bounces = 0       # Bumped every time the ball changes course
+        self.top_limit = 0     # The inside edges of the top and bottom walls,
+        self.bottom_limit = 0  # for the AI's benefit
+        self.max_speed = 900
+        self.speed_up = 1.05   # Speed multiplier for each paddle hit
+        self.max_angle = 60    # Steepest angle off a paddle, in degrees
+
+    def create(self):
+        """Code that executes when an instance of the object is created"""
+        self.width = self.height = 16
+        self.solid = self.visible = True
+
+    def velocity(self):
+        """Returns the ball's velocity as an (x, y) tuple in pixels per
+        second, with y increasing down the screen"""
+        radians = math.radians(self.direction)
+        return (math.cos(radians) * self.speed,
+                -math.sin(radians) * self.speed)
+
+    def on_collide(self, other):
+        """Bounce off a wall or a paddle.  The further from the middle of the
+        paddle the ball hits, the steeper the angle it leaves at"""
+        if other.tag == "wall":
+            self._bounce_off_wall(other)
+            return
+        if other.tag != "paddle":
+            return
+
+        vx, _ = self.velocity()
+        paddle_centre = other.x + other.width / 2
+        ball_centre = self.x + self.width / 2
+
+        # Ignore the hit if we're already moving away from the paddle
+        if (vx < 0) != (ball_centre > paddle_centre):
+            return
+
+        offset = ((self.y + self.height / 2) - (other.y + other.height / 2)) \
+            / ((other.height + self.height) / 2)
+        angle = max(-1.0, min(1.0, offset)) * self.max_angle
+
+        if vx < 0:
+            self.x = other.x + other.width
+            self.direction = -angle
+        else:
+            self.x = other.x - self.width
+            self.direction = 180 + angle
+
+        self.speed = min(self.max_speed, self.speed * self.speed_up)
+        self.bounces += 1
+
+    def _bounce_off_wall(self, wall):
+        """Private method to bounce off the top or bottom of a wall, unless
+        we're already moving away from it"""
+        _, vy = self.velocity()
+        below = self.y + self.height / 2 > wall.y + wall.height / 2
+        if vy and (vy < 0) == below:
+            self.direction = -self.direction
+            self.bounces += 1
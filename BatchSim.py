@@ -0,0 +1,448 @@
+#!/usr/bin/python3
+
+# BatchSim.py
+# Plays thousands of independent matches at once, for tuning the AI and
+# analysing game balance.  The rules are the same as MainGame's (the ball,
+# paddles, bounces, scoring and serving all work the same way, in the same
+# order), but every value is held in a NumPy array with one element per
+# match, so each tick advances every match with a handful of array operations
+# and no rendering.  The balls are swept through each tick just as the
+# ActorManager sweeps MainGame's ball, so the tick can be made much longer
+# (--tick-rate) without the balls passing through anything.
+#
+# Paddle policies are callables which take the simulation and which side
+# they're playing (0 for left, 1 for right), and return an array of moves
+# (-1 up, 1 down, 0 stay) for every match.
+#
+#   python BatchSim.py --matches 10000 --ticks 36000 --processes 4
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+import numpy as np
+from Collision import sweep_boxes
+
+
+# The rules, matching MainGame, Ball and Paddle
+RULES = {
+    "width": 1024,
+    "arena_top": 15,
+    "arena_bottom": 753,
+    "wall_thickness": 10,
+    "paddle_inset": 40,
+    "paddle_width": 16,
+    "paddle_height": 96,
+    "paddle_speed": 480,
+    "ball_size": 16,
+    "serve_speed": 420,
+    "serve_angle": 30,
+    "serve_delay": 1.0,
+    "max_speed": 900,
+    "speed_up": 1.05,
+    "max_angle": 60
+}
+
+
+def predict_intercepts(x, y, vx, vy, line_x, top, bottom):
+    """Array version of PaddleAI.predict_intercept().  Returns the y
+    coordinates at which each point crosses line_x, or NaN where the point
+    is moving away from the line"""
+    height = bottom - top
+    with np.errstate(divide="ignore", invalid="ignore"):
+        time_to_line = (line_x - x) / vx
+        unfolded = np.mod(y - top + vy * time_to_line, 2 * height)
+    unfolded = np.where(unfolded > height, 2 * height - unfolded, unfolded)
+    return np.where((vx != 0) & (time_to_line >= 0), top + unfolded, np.nan)
+
+
+class IdlePolicy:
+    """Never moves the paddle"""
+    def __call__(self, sim, side):
+        return np.zeros(sim.matches, np.int8)
+
+
+class TrackPolicy:
+    """Moves the paddle towards the ball's current height"""
+    def __init__(self, dead_zone=4):
+        self.dead_zone = dead_zone
+
+    def __call__(self, sim, side):
+        offset = (sim.ball_y + sim.rules["ball_size"] / 2) \
+            - (sim.paddle_y[side] + sim.rules["paddle_height"] / 2)
+        return np.sign(offset) * (np.abs(offset) > self.dead_zone)
+
+
+class InterceptPolicy:
+    """Moves the paddle to where the ball will cross its line, like
+    PaddleAI, with an optional Gaussian aiming error (in pixels) drawn
+    afresh each time the ball changes course"""
+    def __init__(self, error=0.0, dead_zone=4):
+        self.error = error
+        self.dead_zone = dead_zone
+        self.targets = None
+        self.seen_bounces = None
+
+    def __call__(self, sim, side):
+        rules = sim.rules
+        half = rules["ball_size"] / 2
+        if self.targets is None:
+            self.targets = np.full(sim.matches,
+                                   (rules["arena_top"]
+                                    + rules["arena_bottom"]) / 2)
+            self.seen_bounces = np.full(sim.matches, -1)
+
+        changed = sim.bounces != self.seen_bounces
+        if changed.any():
+            self.seen_bounces = sim.bounces.copy()
+            vx, vy = sim.velocity()
+            line_x = sim.paddle_x[side] + (rules["paddle_width"] + half
+                                           if side == 0 else -half)
+            target = predict_intercepts(sim.ball_x + half, sim.ball_y + half,
+                                        vx, vy, line_x,
+                                        rules["arena_top"] + half,
+                                        rules["arena_bottom"] - half)
+            target = np.where(np.isnan(target),
+                              (rules["arena_top"] + rules["arena_bottom"]) / 2,
+                              target)
+            if self.error:
+                target += sim.rng.normal(0, self.error, sim.matches)
+            self.targets = np.where(changed, target, self.targets)
+
+        offset = self.targets \
+            - (sim.paddle_y[side] + rules["paddle_height"] / 2)
+        return np.sign(offset) * (np.abs(offset) > self.dead_zone)
+
+
+class BatchSim:
+    def __init__(self, matches, seed=0, dt=1/60, rules=None):
+        """Sets up the given number of matches, each about to serve.
+
+        Parameters
+        ----------
+        matches : int
+            The number of independent matches to play
+        seed : int
+            Seed for the random number generator used for serves
+        dt : float
+            The length of each simulation tick, in seconds
+        rules : dict
+            Overrides for any of the values in RULES
+        """
+        self.matches = matches
+        self.dt = dt
+        self.rules = dict(RULES, **(rules or {}))
+        self.rng = np.random.default_rng(seed)
+        r = self.rules
+
+        self.paddle_x = (float(r["paddle_inset"]),
+                         float(r["width"] - r["paddle_inset"]
+                               - r["paddle_width"]))
+        self.paddle_y = [np.full(matches, (r["arena_top"] + r["arena_bottom"]
+                                           - r["paddle_height"]) / 2)
+                         for _ in range(2)]
+
+        self.ball_x = np.zeros(matches)
+        self.ball_y = np.zeros(matches)
+        self.ball_direction = np.zeros(matches)
+        self.ball_speed = np.zeros(matches)
+        self.bounces = np.zeros(matches, np.int64)
+        self.serve_timer = np.zeros(matches)
+        self.serve_towards = np.where(self.rng.random(matches) < 0.5, 1, -1)
+
+        self.scores = [np.zeros(matches, np.int64) for _ in range(2)]
+
+        # Rally statistics.  A rally's length is the number of paddle hits
+        # between the serve and the point being scored
+        self.rally_hits = np.zeros(matches, np.int64)
+        self.rallies = np.zeros(matches, np.int64)
+        self.rally_total = np.zeros(matches, np.int64)
+        self.rally_longest = np.zeros(matches, np.int64)
+
+        # The most times a ball can hit something in one tick, as for
+        # ActorManager.max_swept_hits
+        self.max_swept_hits = 8
+
+        self.ticks = 0
+        self._reset_balls(np.ones(matches, bool), self.serve_towards)
+
+    def velocity(self):
+        """Returns the ball velocities as (vx, vy) arrays, with y increasing
+        down the screen"""
+        radians = np.radians(self.ball_direction)
+        return (np.cos(radians) * self.ball_speed,
+                -np.sin(radians) * self.ball_speed)
+
+    def step(self, policies):
+        """Advances every match by one tick.  Policies is a pair of paddle
+        policies, for the left and right paddles"""
+        r, dt = self.rules, self.dt
+
+        # Steer, serve, then move everything, as MainGame does
+        moves = [np.asarray(policies[side](self, side)) for side in (0, 1)]
+
+        serving = self.serve_timer > 0
+        self.serve_timer[serving] -= dt
+        serve_now = serving & (self.serve_timer <= 0)
+        if serve_now.any():
+            angle = self.rng.uniform(-r["serve_angle"], r["serve_angle"],
+                                     self.matches)
+            self.ball_direction = np.where(
+                serve_now, np.where(self.serve_towards > 0, angle,
+                                    180 + angle), self.ball_direction)
+            self.ball_speed = np.where(serve_now, r["serve_speed"],
+                                       self.ball_speed)
+            self.bounces += serve_now
+
+        paddle_start = list(self.paddle_y)
+        paddle_vy = [moves[side] * float(r["paddle_speed"])
+                     for side in (0, 1)]
+        for side in (0, 1):
+            self.paddle_y[side] = paddle_start[side] + paddle_vy[side] * dt
+
+        self._sweep_balls(paddle_start, paddle_vy)
+
+        # Stop the paddles at the walls
+        size = r["ball_size"]
+        top, bottom = r["arena_top"], r["arena_bottom"]
+        for side in (0, 1):
+            np.clip(self.paddle_y[side], top, bottom - r["paddle_height"],
+                    out=self.paddle_y[side])
+
+        # Score any balls which have gone past a paddle
+        left_out = self.ball_x + size < 0
+        right_out = ~left_out & (self.ball_x > r["width"])
+        self.scores[1] += left_out
+        self.scores[0] += right_out
+        scored = left_out | right_out
+        if scored.any():
+            self.rallies += scored
+            self.rally_total += np.where(scored, self.rally_hits, 0)
+            self.rally_longest = np.maximum(
+                self.rally_longest, np.where(scored, self.rally_hits, 0))
+            self.rally_hits[scored] = 0
+            self._reset_balls(scored, np.where(left_out, -1, 1))
+
+        self.ticks += 1
+
+    def run(self, ticks, policies):
+        """Runs the given number of ticks, then returns the results"""
+        for _ in range(ticks):
+            self.step(policies)
+        return self.results()
+
+    def results(self):
+        """Returns the per-match scores and rally statistics"""
+        return {
+            "ticks": self.ticks,
+            "score_p1": self.scores[0],
+            "score_p2": self.scores[1],
+            "rallies": self.rallies,
+            "rally_total": self.rally_total,
+            "rally_longest": self.rally_longest
+        }
+
+    def _sweep_balls(self, paddle_y, paddle_vy):
+        """Private method to move the balls through the tick, stopping
+        wherever they touch a paddle or wall to bounce off it, exactly as
+        the ActorManager does with MainGame's ball.  Paddle_y is where the
+        paddles were at the start of the tick, and paddle_vy how fast
+        they're moving"""
+        r, dt = self.rules, self.dt
+        size, thickness = r["ball_size"], r["wall_thickness"]
+        matches = np.arange(self.matches)
+
+        # Everything a ball can hit, as (x, y, width, height, y velocity):
+        # the two paddles, then the top and bottom walls
+        boxes = [(self.paddle_x[side], paddle_y[side], r["paddle_width"],
+                  r["paddle_height"], paddle_vy[side]) for side in (0, 1)]
+        boxes += [(0.0, r["arena_top"] - thickness, r["width"], thickness,
+                   0.0),
+                  (0.0, r["arena_bottom"], r["width"], thickness, 0.0)]
+
+        elapsed = np.zeros(self.matches)
+        ignored = np.zeros((len(boxes), self.matches), bool)
+        live = np.arange(self.matches)   # The balls still on the move
+        ball_vx, ball_vy = self.velocity()
+        for _ in range(self.max_swept_hits):
+            vx, vy = ball_vx[live], ball_vy[live]
+            x, y, now = self.ball_x[live], self.ball_y[live], elapsed[live]
+
+            # Most balls are out in the open, so first pick out the ones
+            # whose path over the rest of the tick reaches the walls or
+            # either paddle's column, and only sweep those
+            left = np.minimum(x, x + vx * (dt - now))
+            right = np.maximum(x, x + vx * (dt - now)) + size
+            near = (np.minimum(y, y + vy * (dt - now)) <= r["arena_top"]) \
+                | (np.maximum(y, y + vy * (dt - now)) + size
+                   >= r["arena_bottom"])
+            for px in self.paddle_x:
+                near |= (left <= px + r["paddle_width"]) & (px <= right)
+            live, vx, vy = live[near], vx[near], vy[near]
+            x, y, now = x[near], y[near], now[near]
+            times = []
+            for i, (box_x, box_y, box_width, box_height, box_vy) \
+                    in enumerate(boxes):
+                if isinstance(box_vy, np.ndarray):
+                    box_y, box_vy = box_y[live], box_vy[live]
+                times.append(np.where(
+                    ignored[i, live], np.inf,
+                    sweep_boxes(x, y, size, size, vx, vy - box_vy, box_x,
+                                box_y + box_vy * now, box_width, box_height,
+                                dt - now)))
+            times = np.array(times)
+            first = np.argmin(times, axis=0)
+            time = times[first, np.arange(len(live))]
+
+            # Only the balls which hit something need sweeping again
+            hit = time < np.inf
+            live, first, time = live[hit], first[hit], time[hit]
+            vx, vy = vx[hit], vy[hit]
+            if not len(live):
+                break
+
+            # Move them up to the point of contact and bounce them
+            self.ball_x[live] += vx * time
+            self.ball_y[live] += vy * time
+            elapsed[live] += time
+
+            course = (self.ball_direction[live], self.ball_speed[live])
+            for side in (0, 1):
+                which = first == side
+                balls = live[which]
+                self._bounce_off_paddle(
+                    side, balls, vx[which],
+                    paddle_y[side][balls]
+                    + paddle_vy[side][balls] * elapsed[balls])
+            for i in (2, 3):
+                which = first == i
+                balls = live[which]
+                wall_y, wall_height = boxes[i][1], boxes[i][3]
+                below = self.ball_y[balls] + size / 2 \
+                    > wall_y + wall_height / 2
+                balls = balls[(vy[which] != 0) & ((vy[which] < 0) == below)]
+                self.ball_direction[balls] = -self.ball_direction[balls]
+                self.bounces[balls] += 1
+
+            # As with the ActorManager, anything which didn't change a
+            # ball's course is ignored for the rest of the tick
+            unchanged = (self.ball_direction[live] == course[0]) \
+                & (self.ball_speed[live] == course[1])
+            ignored[first[unchanged], live[unchanged]] = True
+
+            radians = np.radians(self.ball_direction[live])
+            ball_vx[live] = np.cos(radians) * self.ball_speed[live]
+            ball_vy[live] = -np.sin(radians) * self.ball_speed[live]
+
+        # Then whatever's left of the tick, without stopping
+        self.ball_x += ball_vx * (dt - elapsed)
+        self.ball_y += ball_vy * (dt - elapsed)
+
+    def _bounce_off_paddle(self, side, balls, vx, paddle_y):
+        """Private method to bounce the given balls (indices) off one side's
+        paddle, which is at paddle_y, exactly as Ball.on_collide() does.
+        Vx is their velocity along x"""
+        r = self.rules
+        size = r["ball_size"]
+        px = self.paddle_x[side]
+
+        # Ignore the hit if the ball's already moving away from the paddle
+        towards = (vx < 0) == (self.ball_x[balls] + size / 2
+                               > px + r["paddle_width"] / 2)
+        balls, vx, paddle_y = balls[towards], vx[towards], paddle_y[towards]
+        if not len(balls):
+            return
+
+        offset = ((self.ball_y[balls] + size / 2)
+                  - (paddle_y + r["paddle_height"] / 2)) \
+            / ((r["paddle_height"] + size) / 2)
+        angle = np.clip(offset, -1.0, 1.0) * r["max_angle"]
+        going_left = vx < 0
+        self.ball_x[balls] = np.where(going_left, px + r["paddle_width"],
+                                      px - size)
+        self.ball_direction[balls] = np.where(going_left, -angle,
+                                              180 + angle)
+        self.ball_speed[balls] = np.minimum(
+            r["max_speed"], self.ball_speed[balls] * r["speed_up"])
+        self.bounces[balls] += 1
+        self.rally_hits[balls] += 1
+
+    def _reset_balls(self, which, towards):
+        """Private method to put the selected balls back in the middle,
+        ready to serve towards the given sides"""
+        r = self.rules
+        self.ball_x[which] = (r["width"] - r["ball_size"]) / 2
+        self.ball_y[which] = (r["arena_top"] + r["arena_bottom"]
+                              - r["ball_size"]) / 2
+        self.ball_speed[which] = 0
+        self.bounces += which
+        self.serve_towards = np.where(which, towards, self.serve_towards)
+        self.serve_timer[which] = r["serve_delay"]
+
+
+def _run_shard(args):
+    """Runs one shard of a sharded simulation.  Module level so that it can
+    be sent to a worker process"""
+    matches, ticks, policies, seed, dt, rules = args
+    return BatchSim(matches, seed, dt, rules).run(ticks, policies)
+
+
+def run_sharded(matches, ticks, policies, processes=None, seed=0, dt=1/60,
+                rules=None):
+    """Splits the matches between a pool of worker processes (one per CPU
+    core by default) and combines their results.  Each shard gets its own
+    seed, so the results depend on the number of processes.  Policies must
+    be picklable (the classes in this module are)"""
+    shards = processes or os.cpu_count() or 1
+    sizes = [matches // shards + (i < matches % shards)
+             for i in range(shards)]
+    jobs = [(size, ticks, policies, seed + i, dt, rules)
+            for i, size in enumerate(sizes) if size]
+    with ProcessPoolExecutor(shards) as pool:
+        parts = list(pool.map(_run_shard, jobs))
+
+    combined = {key: np.concatenate([part[key] for part in parts])
+                for key in parts[0] if key != "ticks"}
+    combined["ticks"] = ticks
+    return combined
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Batch Pong simulation")
+    parser.add_argument("--matches", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=60 * 60,
+                        help="ticks to play each match for")
+    parser.add_argument("--tick-rate", type=float, default=60,
+                        help="ticks per second of game time")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes to shard across (0 for one "
+                             "per core)")
+    parser.add_argument("--error", type=float, default=25.0,
+                        help="aiming error of the right hand paddle, in "
+                             "pixels")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policies = (TrackPolicy(), InterceptPolicy(error=args.error))
+    start = time.perf_counter()
+    dt = 1 / args.tick_rate
+    if args.processes == 1:
+        results = BatchSim(args.matches, args.seed, dt).run(args.ticks,
+                                                            policies)
+    else:
+        results = run_sharded(args.matches, args.ticks, policies,
+                              args.processes or None, args.seed, dt)
+    elapsed = time.perf_counter() - start
+
+    rallies = results["rallies"].sum()
+    print(f"Played {args.matches} matches of {args.ticks} ticks "
+          f"({args.ticks * dt:.0f}s of game time) in {elapsed:.2f}s "
+          f"({args.matches * args.ticks / elapsed:,.0f} match-ticks/s)")
+    print(f"Mean score {results['score_p1'].mean():.2f} - "
+          f"{results['score_p2'].mean():.2f}")
+    print(f"{rallies} rallies, mean length "
+          f"{results['rally_total'].sum() / max(1, rallies):.2f} hits, "
+          f"longest {results['rally_longest'].max()}")
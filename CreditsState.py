@@ -11,9 +11,42 @@
 #
 from State import State
 from Graphics import *
+import struct
+import zlib
+
+
+# The credits that we want to scroll through.  Consists of a list of tuples
+# which defines: Style (based on HTML markup tags), the Text to display (line
+# by line), the colour of the text (as an RGB tuple).  Where we want to add
+# spacing, we simply add blank lines of the appropriate style
+CREDITS = [
+    ("h1", "PONG", (255, 255, 161)),
+    ("h2", "", (0, 0, 0)),
+    ("h2", "", (0, 0, 0)),
+    ("h2", "Original Concept", (255, 255, 255)),
+    ("p", "Allan Alcorn", (200, 200, 200)),
+    ("p", "Ted Dabney", (200, 200, 200)),
+    ("p", "Nolan Bushnell", (200, 200, 200)),
+    ("h1", "", (0, 0, 0)),
+    ("h2", "This Implementation", (255, 255, 255)),
+    ("p", "Mark Edwards", (200, 200, 200)),
+    ("h1", "", (0, 0, 0)),
+    ("h1", "", (0, 0, 0)),
+    ("p", "Press the 'Escape' key to return to the menu", (128, 128, 128))
+]
+
+# Definitions for the various styles in the credits.  Typically related to
+# font height, but also to whether fonts are set bold or not
+STYLES = {
+    "h1": (200, True),
+    "h2": (25, True),
+    "p": (20, False)
+}
 
 
 class Credits(State):
+    snapshot_attributes = (("scroll_offset", "d"),)
+
     def __init__(self, game):
         """Perform any on-load initialisation of the state.  e.g. preload
         resources, set persistent buffer lengths, etc. """
@@ -23,50 +56,62 @@ class Credits(State):
         super().__init__(game)
 
         # Do our custom initialisation here
-        self.finished = False
         self.scroll_offset = self.game.height
         self.scroll_speed = self.game.height / 10
 
-        self.credits_surf = None    # Placeholder for the rendered credits
+        # The credits are rendered once onto a static layer, which we simply
+        # move up the screen
+        self.credits_height = 0
+        for cstyle, _, _ in CREDITS:
+            self.credits_height += STYLES[cstyle][0] + 5  # +5 adds a 5px
+                                                          # buffer around lines
+        self.add_layer("credits", self._draw_credits, opaque=True,
+                       size=(self.game.width, self.credits_height))
 
-    def handle_events(self):
-        """Run the 'event pump' and handle any events that arise.  This base
-        class provides a simple event pump that merely checks the presence of
-        the pressing of the space bar and raises the pygame.QUIT event.
-        Processing of the pygame.QUIT event causes the game itself to
-        terminate"""
-        # Run event pump
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.game.is_running = False
+        # The layer covers nearly the whole window, so there's no need for
+        # an intermediate canvas
+        self.render_to_window = True
 
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.finished = True
-    # End handle events
+        # A slow, steady scroll looks just as smooth at half the frame rate
+        self.animation_rate = 30
 
     def update(self, game_time, dt):
         """Update the simulation"""
         # The only interaction here is if the user has pressed the escape
         # key, in which case, we simply pop this state off of the stack...
-        if self.finished is True:
+        if self.game.input.was_pressed("back"):
             self.game.state_manager.pop()
+            return
 
         # Move the credits up the screen.
         self.scroll_offset -= self.scroll_speed * dt
 
         # If we've scrolled off the top of the screen, wrap around again...
-        if self.scroll_offset < -self.credits_surf.get_height():
+        if self.scroll_offset < -self.credits_height:
             self.scroll_offset = self.display_height
     # End update
 
-    def display(self):
-        """Draw the current frame"""
-        self.display_surface.fill(self.black)
-
-        self.display_surface.blit(self.credits_surf, (0, self.scroll_offset))
-
-        self.game.display_window.blit(self.display_surface, (0, 0))
+    def checksum(self):
+        """Returns a checksum of the simulation state"""
+        return zlib.crc32(struct.pack("<d", self.scroll_offset))
+
+    def capture(self):
+        """Returns the scroll position, which is all display() needs from
+        the simulation"""
+        return self.scroll_offset
+
+    def display(self, alpha=0.0, frame=None):
+        """Draw the current frame.  Alpha is the fraction of a timestep (0 to
+        1) that has passed since the last update, for interpolating motion.
+        Frame is what capture() returned after the latest tick"""
+        scroll_offset = self.capture() if frame is None else frame
+
+        # Interpolate the scroll position between updates so the scrolling
+        # stays smooth whatever the frame rate.  Only the strips of window
+        # the credits have moved off need clearing
+        offset = scroll_offset - self.scroll_speed * self.game.dt * alpha
+        self.move_layer("credits", (0, offset))
+        self.compose()
     # End display
 
     def startup(self):
@@ -75,71 +120,33 @@ class Credits(State):
         etc."""
         super().startup()
 
-        # We'll generate the credits here since we want to render them to a
-        # surface which we'll simply use throughout the life of the object.
-        # That way, we can be more efficient.
-
-        # The credits that we want to scroll through.  Consists of a list of
-        # tuples which defines: Style (based on HTML markup tags), the Text
-        # to display (line by line), the colour of the text (as an RGB tuple)
-        # Where we want to add spacing, we simply add blank lines of the
-        # appropriate style
-        credits = [
-            ("h1", "PONG", (255, 255, 161)),
-            ("h2", "", (0, 0, 0)),
-            ("h2", "", (0, 0, 0)),
-            ("h2", "Original Concept", (255, 255, 255)),
-            ("p", "Allan Alcorn", (200, 200, 200)),
-            ("p", "Ted Dabney", (200, 200, 200)),
-            ("p", "Nolan Bushnell", (200, 200, 200)),
-            ("h1", "", (0, 0, 0)),
-            ("h2", "This Implementation", (255, 255, 255)),
-            ("p", "Mark Edwards", (200, 200, 200)),
-            ("h1", "", (0, 0, 0)),
-            ("h1", "", (0, 0, 0)),
-            ("p", "Press the 'Escape' key to return to the menu", (128, 128,
-                                                                   128))
-        ]
-
-        # Definitions for the various styles in the credits.  Typically
-        # related to font height, but also to whether fonts are set bold or not
-        styles = {
-            "h1": (200, True),
-            "h2": (25, True),
-            "p": (20, False)
-        }
-
-        canvas_height = 0
-
-        # Extract just the style tags from the credits list
-        credit_styles = [s[0] for s in credits]
-
-        for i in credit_styles:
-            canvas_height += styles[i][0] + 5   # +5 adds a 5px buffer around
-                                                # lines
-
-        self.credits_surf = pygame.Surface((self.display_width, canvas_height))
-        self.credits_surf.fill(self.black)
+        self.scroll_offset = self.display_height
+
+    def _draw_credits(self, surface):
+        """Private method to render the full set of credits onto the credits
+        layer.  If we've been shown before, then the layer may still be warm
+        from last time, in which case this isn't called"""
+        surface.fill(self.black)
 
         # Get half the first offset for our starting point
         v_offset = 0
 
-        for cstyle, text, colour in credits:
-            draw_text(self.credits_surf,
+        for cstyle, text, colour in CREDITS:
+            draw_text(surface,
                       text,
                       pygame.font.get_default_font(),
-                      styles[cstyle][0],
+                      STYLES[cstyle][0],
                       self.display_width // 2,
-                      v_offset + styles[cstyle][0] // 2,
-                      colour)
+                      v_offset + STYLES[cstyle][0] // 2,
+                      colour,
+                      scale=self.game.render_scale)
 
-            v_offset += styles[cstyle][0] + 5
+            v_offset += STYLES[cstyle][0] + 5
 
     def cleanup(self):
         """Perform any cleanup of resources once the state is no longer
         current (e.g. clearing buffers, deallocating resources, etc."""
-        # Destroy the drawing surface for the state to free memory when GC runs
+        # Hand the drawing surface for the state back.  The credits themselves
+        # are kept until the state manager asks for them to be released
         super().cleanup()
 
-        # Free up the memory used by the credits surface
-        self.credits_surf = None
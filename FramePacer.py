@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+
+# FramePacer.py
+# Caps the rate at which the main loop presents frames.  Most of the wait is
+# done by sleeping so that we give the CPU back to the OS, but since sleep()
+# is only accurate to a millisecond or two, the last little bit is done by
+# spinning on the high resolution timer.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import time
+
+
+class FramePacer:
+    def __init__(self, target_fps=60, spin_threshold=0.002):
+        """Initialises the pacer.
+
+        Parameters
+        ----------
+        target_fps : int
+            The maximum number of frames per second.  0 (or None) disables
+            the cap so wait() returns immediately.
+        spin_threshold : float
+            How long before the deadline (in seconds) we stop sleeping and
+            start spinning.  Should be a little larger than the granularity
+            of time.sleep() on the host OS.
+        """
+        self.spin_threshold = spin_threshold
+        self.frame_period = 0.0
+        self.next_deadline = None
+        self.set_target_fps(target_fps)
+
+    def set_target_fps(self, target_fps):
+        """Changes the frame rate cap"""
+        self.target_fps = target_fps
+        self.frame_period = 1 / target_fps if target_fps else 0.0
+        self.next_deadline = None
+
+    def reset(self):
+        """Forgets the current deadline, so the next frame is timed from
+        now.  Used after the main loop has been waiting by other means"""
+        self.next_deadline = None
+
+    def wait(self):
+        """Blocks until it's time to start the next frame"""
+        if not self.frame_period:
+            return
+
+        now = time.perf_counter()
+        if self.next_deadline is None:
+            self.next_deadline = now
+
+        self.next_deadline += self.frame_period
+
+        # If we've fallen more than a whole frame behind then don't try and
+        # catch up by running frames back to back, just start again from now
+        if now > self.next_deadline:
+            self.next_deadline = now
+            return
+
+        # Sleep for most of the remaining time...
+        remaining = self.next_deadline - now - self.spin_threshold
+        if remaining > 0:
+            time.sleep(remaining)
+
+        # ...then spin for the rest so we hit the deadline accurately
+        while time.perf_counter() < self.next_deadline:
+            pass
@@ -10,9 +10,10 @@
 #
 
 import pygame
+from TextCache import text_cache
 
 
-def draw_text(surface, text, font, size, x, y, colour):
+def draw_text(surface, text, font, size, x, y, colour, scale=1.0):
     """Renders a text string to the specified drawing surface
 
     Parameters
@@ -24,14 +25,100 @@ def draw_text(surface, text, font, size, x, y, colour):
     font : str
         The filename of the font we want to use for display
     size : int
-        The height of the font (in pixels)
+        The height of the font (in the game's coordinates)
     x, y : int
-        The x and y coordinates of the centre of the string
+        The x and y coordinates of the centre of the string (in the game's
+        coordinates)
     colour : (int, int, int)
         The RGB tuple of the colour we want to display the font in
+    scale : float
+        The number of the surface's pixels per unit of the game's
+        coordinates.  Frames may be drawn at a lower resolution than the
+        game's coordinates (see Game.render_resolution), so states pass
+        their game's render_scale
+
+    Returns
+    -------
+    pygame.Rect
+        The area of the surface covered by the text, in pixels
+
+    Fonts and rendered strings are cached in TextCache.text_cache, so drawing
+    the same text every frame only rasterises it once.
     """
-    font = pygame.font.Font(font, size)
-    text_surface = font.render(text, True, colour)
+    text_surface = text_cache.render(text, font,
+                                     max(1, round(size * scale)), colour)
     text_rect = text_surface.get_rect()
-    text_rect.center = (x, y)
+    text_rect.center = (round(x * scale), round(y * scale))
     surface.blit(text_surface, text_rect)
+    return text_rect
+
+
+def merge_rects(rects):
+    """Merges a list of rectangles so that no two of the returned rectangles
+    overlap or touch.  Overlapping rectangles are replaced by their bounding
+    box, which may cover a few pixels that weren't in either, but keeps the
+    number of rectangles we hand to pygame.display.update() small
+
+    Parameters
+    ----------
+    rects : list of pygame.Rect
+        The rectangles to merge.  Empty rectangles are discarded
+
+    Returns
+    -------
+    list of pygame.Rect
+        The merged rectangles
+    """
+    merged = [pygame.Rect(r) for r in rects if r.width > 0 and r.height > 0]
+
+    # Keep going until a full pass doesn't find anything to merge
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        while merged:
+            current = merged.pop()
+            i = 0
+            while i < len(merged):
+                # inflate() means rects which just touch get merged too
+                if current.inflate(1, 1).colliderect(merged[i]):
+                    current.union_ip(merged.pop(i))
+                    changed = True
+                else:
+                    i += 1
+            result.append(current)
+        merged = result
+
+    return merged
+
+
+def subtract_rect(rect, hole):
+    """Returns the parts of a rectangle which aren't covered by another, as
+    up to four non-overlapping rectangles
+
+    Parameters
+    ----------
+    rect : pygame.Rect
+        The rectangle to cut the hole out of
+    hole : pygame.Rect
+        The area to remove
+
+    Returns
+    -------
+    list of pygame.Rect
+        The strips above, below, left and right of the hole which are
+        inside rect (any which would be empty are left out)
+    """
+    hole = rect.clip(hole)
+    if not hole:
+        return [pygame.Rect(rect)]
+
+    pieces = [
+        pygame.Rect(rect.left, rect.top, rect.width, hole.top - rect.top),
+        pygame.Rect(rect.left, hole.bottom, rect.width,
+                    rect.bottom - hole.bottom),
+        pygame.Rect(rect.left, hole.top, hole.left - rect.left, hole.height),
+        pygame.Rect(hole.right, hole.top, rect.right - hole.right,
+                    hole.height)
+    ]
+    return [piece for piece in pieces if piece.width > 0 and piece.height > 0]
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+# InputManager.py
+# Central handling of the player's input.  The pygame event queue is drained
+# once per frame, and key presses are translated through a key map into a
+# set of named actions.  Each action has a bit in an integer bitmask, and we
+# keep three masks: actions which are held down, and those which have been
+# pressed or released since the last simulation tick.  The states read these
+# masks from their update() methods rather than running their own event pumps.
+#
+# What the pump sees is gathered separately, and only moved into the masks at
+# the start of each tick by begin_tick().  That way a tick always sees the
+# same input from start to finish, even if the simulation is running on a
+# different thread to the pump.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import threading
+import pygame
+
+
+# The default mapping of keys to actions.  More than one key can map to the
+# same action
+DEFAULT_KEY_MAP = {
+    pygame.K_UP: "up",
+    pygame.K_DOWN: "down",
+    pygame.K_SPACE: "select",
+    pygame.K_ESCAPE: "back",
+    pygame.K_a: "p1_up",
+    pygame.K_z: "p1_down",
+    pygame.K_l: "p2_up",
+    pygame.K_COMMA: "p2_down"
+}
+
+# The only events we're interested in.  Everything else is blocked so that
+# pygame doesn't even put it on the queue
+ALLOWED_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP]
+
+
+class InputManager:
+    def __init__(self, key_map=None):
+        """Initialises the input manager.
+
+        Parameters
+        ----------
+        key_map : dict
+            Maps pygame key codes to action names.  If not given, then
+            DEFAULT_KEY_MAP is used
+        """
+        self.actions = {}   # Action name -> bit
+        self.key_map = {}   # Key code -> bit
+        self.set_key_map(DEFAULT_KEY_MAP if key_map is None else key_map)
+
+        self.held = 0       # Actions held down as this tick began
+        self.pressed = 0    # Actions pressed before this tick
+        self.released = 0   # Actions released before this tick
+        self.keys_down = set()
+        self.quit_requested = False
+
+        # The pump's view of the same, waiting for the next begin_tick()
+        self.pending_held = 0
+        self.pending_pressed = 0
+        self.pending_released = 0
+        self.lock = threading.Lock()
+
+    def set_key_map(self, key_map):
+        """Replaces the key map.  Each new action name is given the next free
+        bit; existing actions keep theirs"""
+        self.key_map = {}
+        for key, action in key_map.items():
+            self.key_map[key] = self.bit(action)
+
+    def bit(self, action):
+        """Returns the bit used for the named action"""
+        if action not in self.actions:
+            self.actions[action] = 1 << len(self.actions)
+        return self.actions[action]
+
+    def filter_events(self):
+        """Tells pygame to only queue the events we're interested in.  Must
+        be called after the display has been initialised"""
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(ALLOWED_EVENTS)
+
+    def pump(self):
+        """Drains the event queue and updates the action masks.  Should be
+        called once per frame"""
+        events = pygame.event.get()
+        with self.lock:
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit_requested = True
+                elif event.type == pygame.KEYDOWN and \
+                        event.key in self.key_map:
+                    self.keys_down.add(event.key)
+                    self._update_held()
+                elif event.type == pygame.KEYUP and \
+                        event.key in self.key_map:
+                    self.keys_down.discard(event.key)
+                    self._update_held()
+
+    def wait(self, timeout):
+        """Blocks until an event arrives or the timeout (in seconds) runs
+        out, whichever is first.  The event is put back for the next pump().
+        Returns True if an event arrived"""
+        if timeout <= 0:
+            return False
+        event = pygame.event.wait(max(1, int(timeout * 1000)))
+        if event.type == pygame.NOEVENT:
+            return False
+        pygame.event.post(event)
+        return True
+
+    def begin_tick(self):
+        """Takes the input gathered by the pump since the last tick as this
+        tick's input.  Called at the start of every simulation tick"""
+        with self.lock:
+            self.held = self.pending_held
+            self.pressed = self.pending_pressed
+            self.released = self.pending_released
+            self.pending_pressed = self.pending_released = 0
+
+    def end_tick(self):
+        """Clears the pressed and released edges once a simulation tick has
+        seen them, so that each press is only acted on once"""
+        self.pressed = self.released = 0
+
+    def is_held(self, action):
+        """Returns True if the action is currently held down"""
+        return bool(self.held & self.actions.get(action, 0))
+
+    def was_pressed(self, action):
+        """Returns True if the action was pressed since the last tick"""
+        return bool(self.pressed & self.actions.get(action, 0))
+
+    def was_released(self, action):
+        """Returns True if the action was released since the last tick"""
+        return bool(self.released & self.actions.get(action, 0))
+
+    def _update_held(self):
+        """Private method to recalculate the held mask from the keys which
+        are down, recording any edges.  Edges are recorded on every event,
+        so a key pressed and released within one frame still registers"""
+        held = 0
+        for key in self.keys_down:
+            held |= self.key_map[key]
+
+        self.pending_pressed |= held & ~self.pending_held
+        self.pending_released |= self.pending_held & ~held
+        self.pending_held = held
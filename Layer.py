@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+# Layer.py
+# One layer of a state's display, composed by State.compose().  A static
+# layer is drawn once onto a surface of its own, which is kept and copied
+# into the frame wherever the frame needs repairing, and only drawn again
+# when it's invalidated; it can be moved around the frame without being
+# redrawn.  A dynamic layer is drawn straight onto the frame, every frame.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import pygame
+
+
+class Layer:
+    def __init__(self, name, draw, static=True, opaque=False, size=None):
+        """Initialises the layer.
+
+        Parameters
+        ----------
+        name : str
+            What the state calls the layer
+        draw : callable
+            For a static layer, draw(surface) draws the layer's content onto
+            its own surface.  For a dynamic layer, draw(surface, frame,
+            alpha) draws onto the frame and returns a list of the rects it
+            drew in
+        static : bool
+            Whether the layer is static or dynamic
+        opaque : bool
+            Whether a static layer covers everything beneath it.  Opaque
+            layers save having to draw the layers under them at all
+        size : tuple
+            The size of a static layer's surface, in pixels.  Defaults to
+            the size of the state's drawing canvas
+        """
+        self.name = name
+        self.draw = draw
+        self.static = static
+        self.opaque = opaque
+        self.size = size
+
+        self.surface = None       # A static layer's content, once drawn
+        self.offset = (0, 0)      # Where the surface goes in the frame, in
+                                  # pixels
+        self.drawn_offset = None  # Where it was in the last frame composed
+
+        # The areas of a static layer's surface (in its own coordinates)
+        # which need drawing again.  It's all drawn when first composed
+        self.invalid = []
+
+        # Where a dynamic layer drew in the last frame
+        self.drawn_rects = []
+
+    @property
+    def rect(self):
+        """The area a static layer covers in the frame"""
+        return pygame.Rect(self.offset, self.surface.get_size())
+
+    @property
+    def drawn_rect(self):
+        """The area a static layer covered in the last frame composed"""
+        return pygame.Rect(self.drawn_offset, self.surface.get_size())
@@ -9,10 +9,29 @@
 #
 from State import State
 from Graphics import *
+from ActorManager import ActorManager
+from Ball import Ball
+from Paddle import Paddle
+from Wall import Wall
+from PaddleAI import PaddleAI
+from Playfield import load_regions
+from Snapshot import unpack_attributes
 import math
+import struct
+import zlib
 
 
 class MainGame(State):
+    snapshot_attributes = (
+        ("score_p1", "i"), ("score_p2", "i"), ("num_players", "i"),
+        ("game_is_running", "?"), ("p1_up", "?"), ("p1_down", "?"),
+        ("p2_up", "?"), ("p2_down", "?"), ("serve_timer", "d"),
+        ("serve_towards", "i"))
+
+    # Which slots the ball and paddles are in, and whether there's an AI,
+    # follow the snapshot_attributes in a snapshot
+    SNAPSHOT_ACTORS = struct.Struct("<iii?")
+
     def __init__(self, game):
         """Performs any on-load initialisation of the state.  e.g. preloading
         of resources, set persistent buffer lengths, etc."""
@@ -34,45 +53,240 @@ class MainGame(State):
 
         self.playfield = None
 
-    def handle_events(self):
-        """Run the 'event pump' for this particular state.  Note that we
-        don't call the superclass handler here as each state should
-        individually process the state messages"""
-        for event in pygame.event.get():
-            # First check to see if the game is quitting
-            if event.type == pygame.QUIT:
-                self.game_is_running = False
-
-            # Check to see if the user has pressed a key, if so, set the
-            # appropriate flags
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.game_is_running = False
-                if event.key == pygame.K_a:
-                    self.p1_up = True
-                if event.key == pygame.K_z:
-                    self.p1_down = True
-                if event.key == pygame.K_COMMA:
-                    self.p2_down = True
-                if event.key == pygame.K_l:
-                    self.p2_up = True
-    # End handle_events
+        # The playfield covers the whole window, so we draw straight onto it
+        self.render_to_window = True
+
+        # Where the walls are, worked out from the playfield image itself
+        # the first time we start up (not here, since we may be constructed
+        # on the prewarming thread), and how far in from the sides of the
+        # window the paddles sit
+        self.wall_rects = None
+        self.arena_top = 0
+        self.arena_bottom = game.height
+        self.paddle_inset = 40
+
+        # The ball, paddles and walls
+        self.actors = ActorManager(game)
+        self.actors.load_objects({"ball": Ball, "paddle": Paddle,
+                                  "wall": Wall})
+        self.ball = self.paddle_p1 = self.paddle_p2 = None
+        self.walls = []
+        self.serve_speed = 420
+        self.serve_delay = 1.0    # Pause (in seconds) before each serve
+        self.serve_timer = 0.0
+        self.serve_towards = 1    # Which way the next serve goes (1 = right)
+
+        # The computer player for one player games
+        self.ai = None
+        self.ai_difficulty = "normal"
+
+        # Set to a NetHost or NetClient (see NetPlay) for a game over the
+        # network.  The host plays the left paddle and the client the right,
+        # each using the player one keys
+        self.net = None
+
+        # Where things were drawn last frame, so they can be rubbed out
+        self.drawn_rects = []
+        self.drawn_scores = None
 
     def update(self, game_time, dt):
         """Update the simulation"""
+        player = self.game.input
+
+        if player.was_pressed("back"):
+            self.game_is_running = False
+
+        # Over the network, the game ends if the other end goes quiet
+        if self.net is not None and self.net.timed_out:
+            print("Lost contact with the other player")
+            self.game_is_running = False
+
         if not self.game_is_running:
+            # Let the client know the game is over
+            if self.net is not None and self.net.is_host:
+                self.net.send_snapshot(self.game.tick_count, self.net_state())
             self.game.state_manager.pop()
+            return
+
+        if self.net is not None and not self.net.is_host:
+            self._client_update(dt)
+            return
+
+        # The host can't start until the client's first packet tells it who
+        # it's playing against, so hold everything until then
+        if self.net is not None and not self.net.connected:
+            return
 
+        # The paddles move for as long as their keys are held down.  In a one
+        # player game, the computer takes the right hand paddle
+        self.p1_up = player.is_held("p1_up")
+        self.p1_down = player.is_held("p1_down")
+        if self.ai is not None:
+            move = self.ai.update(dt)
+            self.p2_up, self.p2_down = move < 0, move > 0
+        elif self.net is not None:
+            move = self.net.next_move()
+            self.p2_up, self.p2_down = move < 0, move > 0
+        else:
+            self.p2_up = player.is_held("p2_up")
+            self.p2_down = player.is_held("p2_down")
+
+        self.paddle_p1.steer(self.p1_down - self.p1_up)
+        self.paddle_p2.steer(self.p2_down - self.p2_up)
+
+        # Serve after a short pause
+        if self.serve_timer > 0:
+            self.serve_timer -= dt
+            if self.serve_timer <= 0:
+                self._serve()
+
+        self.actors.update(dt)
+
+        # Check whether the ball has gone past either paddle
+        if self.ball.x + self.ball.width < 0:
+            self.score_p2 += 1
+            self._reset_ball(towards=-1)
+        elif self.ball.x > self.display_width:
+            self.score_p1 += 1
+            self._reset_ball(towards=1)
+
+        if self.net is not None:
+            self.net.send_snapshot(self.game.tick_count, self.net_state())
     # End update
 
-    def display(self):
-        """Draw the current frame"""
-        # We don't need to worry about clearing the previous frame since the
-        # playfield will obscure everything
-        self.display_surface.blit(self.playfield, (0, 0))
+    def snapshot(self):
+        """Returns the simulation state as bytes: our own attributes, the
+        actors, and the AI (if there is one)"""
+        return b"".join((
+            super().snapshot(),
+            self.SNAPSHOT_ACTORS.pack(self.ball.slot, self.paddle_p1.slot,
+                                      self.paddle_p2.slot,
+                                      self.ai is not None),
+            self.actors.snapshot(),
+            self.ai.snapshot() if self.ai is not None else b""))
+
+    def restore(self, data):
+        """Puts back the simulation state from bytes returned by
+        snapshot()"""
+        offset = unpack_attributes(self, data)
+        ball, paddle_p1, paddle_p2, has_ai = \
+            self.SNAPSHOT_ACTORS.unpack_from(data, offset)
+        offset = self.actors.restore(data,
+                                     offset + self.SNAPSHOT_ACTORS.size)
+
+        owners = self.actors.owners
+        self.ball = owners[ball]
+        self.paddle_p1, self.paddle_p2 = owners[paddle_p1], owners[paddle_p2]
+        self.walls = [actor for actor in self.actors.instances.values()
+                      if actor.tag == "wall"]
+        if has_ai:
+            self.ai = PaddleAI(self.paddle_p2, self.ball, self.game.rng)
+            self.ai.restore(data, offset)
+        else:
+            self.ai = None
+        self.mark_dirty()
+
+    def net_state(self):
+        """Returns the state sent to a network client, as a dict of the
+        fields listed in NetPlay.SNAPSHOT_FIELDS"""
+        return {
+            "score_p1": self.score_p1,
+            "score_p2": self.score_p2,
+            "running": self.game_is_running,
+            "serve_timer": max(0.0, self.serve_timer),
+            "ball_x": self.ball.x,
+            "ball_y": self.ball.y,
+            "ball_direction": self.ball.direction,
+            "ball_speed": self.ball.speed,
+            "paddle_p1_y": self.paddle_p1.y,
+            "paddle_p1_move": self.paddle_p1.move,
+            "paddle_p2_y": self.paddle_p2.y,
+            "paddle_p2_move": self.paddle_p2.move
+        }
+
+    def apply_net_state(self, state):
+        """Takes on the state in a snapshot from the network host"""
+        self.score_p1 = int(state["score_p1"])
+        self.score_p2 = int(state["score_p2"])
+        self.game_is_running = bool(state["running"])
+        self.serve_timer = state["serve_timer"]
+        self.ball.x = state["ball_x"]
+        self.ball.y = state["ball_y"]
+        self.ball.direction = state["ball_direction"]
+        self.ball.speed = state["ball_speed"]
+        self.paddle_p1.y = state["paddle_p1_y"]
+        self.paddle_p1.steer(int(state["paddle_p1_move"]))
+        self.paddle_p2.y = state["paddle_p2_y"]
+
+    def checksum(self):
+        """Returns a checksum of the simulation state"""
+        checksum = zlib.crc32(struct.pack("<ii?????", self.score_p1,
+                                          self.score_p2, self.game_is_running,
+                                          self.p1_up, self.p1_down,
+                                          self.p2_up, self.p2_down))
+        if self.ball is not None:
+            checksum = zlib.crc32(struct.pack(
+                "<dddddd", self.ball.x, self.ball.y, self.ball.direction,
+                self.ball.speed, self.paddle_p1.y, self.paddle_p2.y),
+                checksum)
+        return checksum
+
+    def capture(self):
+        """Returns the scores, and the position, size and motion of the ball
+        and paddles, which is everything display() needs"""
+        return ((self.score_p1, self.score_p2),
+                tuple((actor.x, actor.y, actor.width, actor.height,
+                       actor.direction, actor.speed)
+                      for actor in (self.ball, self.paddle_p1,
+                                    self.paddle_p2)))
+
+    def display(self, alpha=0.0, frame=None):
+        """Draw the current frame.  Alpha is the fraction of a timestep (0 to
+        1) that has passed since the last update, for interpolating motion.
+        Frame is what capture() returned after the latest tick"""
+        surface = self.display_surface
+        scores, actors = self.capture() if frame is None else frame
 
-        # Display the drawing canvas on the game window...
-        self.game.display_window.blit(self.display_surface, (0, 0))
+        # Work out where everything goes this frame.  Both where things were
+        # and where they are now need redrawing.  The ball leaves the window
+        # when a point is scored, and fill() doesn't cope with rects hanging
+        # off the left or top, so they're clipped to the window
+        frame = surface.get_rect()
+        rects = [self._draw_rect(actor, alpha).clip(frame)
+                 for actor in actors]
+        for rect in self.drawn_rects + rects:
+            self.mark_dirty(rect)
+
+        # The scores need redrawing if they've changed or anything has
+        # rubbed them out
+        score_centres = [(self.display_width // 4, 70),
+                         (3 * self.display_width // 4, 70)]
+        score_rects = [self.game.scale_rect((x - 100, y - 40, 200, 80))
+                       for x, y in score_centres]
+        redraw_scores = scores != self.drawn_scores
+        for rect in score_rects:
+            if redraw_scores or rect.collidelist(self.dirty_rects) != -1:
+                redraw_scores = True
+        if redraw_scores:
+            for rect in score_rects:
+                self.mark_dirty(rect)
+
+        # We're drawing straight onto the window, which still holds the last
+        # frame, so we only need to restore the playfield where things have
+        # changed.  The playfield itself never changes, so after the first
+        # frame this only covers what has moved
+        for rect in self.dirty_rects:
+            surface.blit(self.playfield, rect, rect)
+
+        if redraw_scores:
+            for score, (x, y) in zip(scores, score_centres):
+                draw_text(surface, str(score), pygame.font.get_default_font(),
+                          72, x, y, self.white, scale=self.game.render_scale)
+            self.drawn_scores = scores
+
+        for rect in rects:
+            surface.fill(self.white, rect)
+        self.drawn_rects = rects
     # End display
 
     def startup(self):
@@ -81,10 +295,49 @@ class MainGame(State):
         etc."""
         super().startup()
 
-        # Load in the background playfield and assign to a surface so we can
-        # simply blit it as needed
-        self.playfield = pygame.image.load("playfield.png")
-        self.playfield.convert()
+        # Get the background playfield (already converted to the display
+        # format, and scaled to the size we're drawing at) so we can simply
+        # blit it as needed.  We may still have it from the last time we were
+        # current
+        if self.playfield is None:
+            self.playfield = self.game.assets.get_image(
+                "playfield.png", size=self.game.render_resolution)
+        if self.wall_rects is None:
+            self._find_walls("playfield.png")
+
+        self.score_p1 = self.score_p2 = 0
+        self.drawn_rects = []
+        self.drawn_scores = None
+
+        # Put the paddles in the middle of each end
+        self.paddle_p1 = self.actors.create_instance("paddle")
+        self.paddle_p2 = self.actors.create_instance("paddle")
+        for paddle, x in ((self.paddle_p1, self.paddle_inset),
+                          (self.paddle_p2, self.display_width
+                           - self.paddle_inset - self.paddle_p2.width)):
+            paddle.x = x
+            paddle.y = (self.arena_top + self.arena_bottom
+                        - paddle.height) / 2
+            paddle.top_limit = self.arena_top
+            paddle.bottom_limit = self.arena_bottom
+
+        # The walls, for the ball to bounce off
+        self.walls = []
+        for rect in self.wall_rects:
+            wall = self.actors.create_instance("wall")
+            wall.x, wall.y, wall.width, wall.height = rect
+            self.walls.append(wall)
+
+        self.ball = self.actors.create_instance("ball")
+        self.ball.top_limit = self.arena_top
+        self.ball.bottom_limit = self.arena_bottom
+        self._reset_ball(towards=1 if self.game.rng.random() < 0.5 else -1)
+
+        if self.num_players == 1:
+            self.ai = PaddleAI(self.paddle_p2, self.ball, self.game.rng,
+                               self.ai_difficulty)
+        else:
+            self.ai = None
 
         self.game_is_running = True
 
@@ -92,3 +345,110 @@ class MainGame(State):
         """Perform any cleanup of resources once the state is no longer
         current (e.g. clearing buffers, deallocating resources, etc."""
         super().cleanup()
+
+        # Put the ball, paddles and walls back in the pool for next time
+        for actor in [self.ball, self.paddle_p1, self.paddle_p2] + self.walls:
+            if actor is not None:
+                self.actors.destroy_instance(actor)
+        self.ball = self.paddle_p1 = self.paddle_p2 = None
+        self.walls = []
+        self.ai = None
+
+        # A network game is over once we leave it, so the next game is a
+        # local one
+        if self.net is not None:
+            self.net.close()
+            self.net = None
+
+    def release_resources(self):
+        """Let the asset manager know we're done with the playfield.  It's
+        evicted rather than left cached, so the memory really is freed"""
+        super().release_resources()
+        if self.playfield is not None:
+            self.game.assets.release_image(
+                "playfield.png", size=self.game.render_resolution,
+                evict=True)
+        self.playfield = None
+
+    def resident_bytes(self):
+        """Returns the number of bytes held by the playfield and any
+        layers"""
+        held = super().resident_bytes()
+        if self.playfield is not None:
+            held += self.playfield.get_pitch() * self.playfield.get_height()
+        return held
+
+    def _find_walls(self, path):
+        """Private method to find the walls in the playfield image (see
+        Playfield).  The solid regions which run the whole width of the
+        image are walls; anything else, such as the net, is just for show.
+        The arena is the space between the lowest wall in the top half and
+        the highest in the bottom half"""
+        size, regions = load_regions(path)
+        scale_x = self.game.width / size[0]
+        scale_y = self.game.height / size[1]
+        self.wall_rects = [(rect.x * scale_x, rect.y * scale_y,
+                            rect.width * scale_x, rect.height * scale_y)
+                           for rect in regions if rect.width == size[0]]
+
+        middle = self.game.height / 2
+        self.arena_top = max([y + height
+                              for _, y, _, height in self.wall_rects
+                              if y + height <= middle], default=0)
+        self.arena_bottom = min([y for _, y, _, _ in self.wall_rects
+                                 if y >= middle], default=self.game.height)
+
+    def _reset_ball(self, towards):
+        """Private method to put the ball back in the middle, ready to be
+        served towards the given side (1 for right, -1 for left)"""
+        self.ball.x = (self.display_width - self.ball.width) / 2
+        self.ball.y = (self.arena_top + self.arena_bottom
+                       - self.ball.height) / 2
+        self.ball.speed = 0
+        self.ball.bounces += 1
+        self.serve_towards = towards
+        self.serve_timer = self.serve_delay
+
+    def _serve(self):
+        """Private method to send the ball off at a random angle"""
+        angle = self.game.rng.uniform(-30, 30)
+        self.ball.direction = angle if self.serve_towards > 0 else 180 + angle
+        self.ball.speed = self.serve_speed
+        self.ball.bounces += 1
+
+    def _client_update(self, dt):
+        """Private method to run a tick of a network game on the client.  The
+        host decides what happens; we just move our own paddle straight
+        away, and let everything else carry on as it was going until the
+        next snapshot arrives"""
+        player = self.game.input
+        move = player.is_held("p1_down") - player.is_held("p1_up")
+
+        state = self.net.poll()
+        if state is not None:
+            self.apply_net_state(state)
+            if not self.game_is_running:
+                return
+
+            # The snapshot is from before the host saw our latest moves, so
+            # make them again on top of it
+            for pending in self.net.pending_moves():
+                self.paddle_p2.y += pending * self.paddle_p2.max_speed * dt
+                self.paddle_p2.update()
+
+        self.net.send_input(move)
+        self.p2_up, self.p2_down = move < 0, move > 0
+        self.paddle_p2.steer(move)
+        self.actors.update(dt)
+
+    def _draw_rect(self, actor, alpha):
+        """Private method returning the rectangle to draw an actor in, given
+        its (x, y, width, height, direction, speed) from capture(), moved on
+        by alpha of a tick so the motion is smooth.  The rectangle is in the
+        frame's pixels"""
+        x, y, width, height, direction, speed = actor
+        radians = math.radians(direction)
+        step = speed * self.game.dt * alpha
+        return self.game.scale_rect((x + math.cos(radians) * step,
+                                     y - math.sin(radians) * step,
+                                     width, height))
@@ -15,6 +15,8 @@ import math
 
 
 class MainMenu(State):
+    snapshot_attributes = (("current_entry", "i"),)
+
     def __init__(self, game):
         """Performs any on-load initialisation of the state.  e.g. preloading
         of resources, set persistent buffer lengths, etc."""
@@ -24,17 +26,15 @@ class MainMenu(State):
         super().__init__(game)
 
         # Do our custom initialisation here
-        self.up = self.down = self.select = False
-
         # List of entries in the menu.  Each element is a tuple consisting of
         # the text to display, the y offset (in pixels from the top of the menu)
         # the colour of the text to render as an RGB tuple and finally a lambda
         # defining what we want to do when the menu item is selected.
         self.entries = [
             ("One Player", 0, (255, 255, 255),
-                lambda: self.game.state_manager.push("MainGame")),
+                lambda: self.start_game(1)),
             ("Two Player", 25, (255, 255, 255),
-                lambda: self.game.state_manager.push("MainGame")),
+                lambda: self.start_game(2)),
             #("Options", 60, (200, 200, 200),
             #    lambda: print("Show options menu")),
             ("Credits", 85, (200, 200, 200),
@@ -45,86 +45,103 @@ class MainMenu(State):
         self.current_entry = 0   # Index of the currently selected menu item
         self.selected_pulse = 0  # Will be used to increase/decrease the size
                                  # of the selected menu item
+
+        # Nothing moves but the pulse, which only changes size a few times a
+        # second, so there's no need to draw the menu at the full frame rate
+        self.animation_rate = 10
         self.max_menu = len(self.entries)-1
-        self.last_update = 0.0
-
-    def handle_events(self):
-        """Run the 'event pump' for this particular state.  Note that we
-        don't call the superclass handler here as each state should
-        individually process the state messages"""
-        for event in pygame.event.get():
-            # First, check to see if we're quitting the game
-            if event.type == pygame.QUIT:
-                self.game.is_running = False
-
-            # Check to see if the user has pressed or released a key, if so,
-            # set the appropriate flags
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    self.game_is_running = False
-                    pygame.event.post(pygame.event.Event(pygame.QUIT))
-                if event.key == pygame.K_DOWN:
-                    self.down = True
-                if event.key == pygame.K_UP:
-                    self.up = True
-                if event.key == pygame.K_SPACE:
-                    self.select = True
-    # End handle_events
+
+        # The title and the entries which aren't selected only change when
+        # the selection moves, so they're kept on static layers.  Only the
+        # pulsing selected entry is drawn every frame
+        self.add_layer("title", self._draw_title, opaque=True)
+        self.add_layer("entries", self._draw_entries)
+        self.add_layer("selected", self._draw_selected, static=False)
+        self.entries_layer_skips = None   # The entry left off the layer
 
     def update(self, game_time, dt):
         """Update the simulation"""
-        # We want to throttle the update of the menu items so that the cursor
-        # doesn't move faster than the user can perceive it, so we'll limit
-        # our updates to once every 0.25 seconds
-        if self.last_update < game_time - 0.125:
-            self.last_update = game_time
+        # Each key press moves the cursor by one entry, however long the key
+        # is held for
+        player = self.game.input
 
-            if self.down is True and self.current_entry < self.max_menu:
-                self.current_entry += 1
-            if self.up is True and self.current_entry > 0:
-                self.current_entry -= 1
+        if player.was_pressed("back"):
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
 
-            self.up = self.down = False
+        if player.was_pressed("down") and self.current_entry < self.max_menu:
+            self.current_entry += 1
+        if player.was_pressed("up") and self.current_entry > 0:
+            self.current_entry -= 1
 
-        if self.select is True:
+        if player.was_pressed("select"):
             _, _, _, x = self.entries[self.current_entry]
             x()
-            self.select = False
     # End update
 
-    def display(self):
-        """Draw the current frame"""
-        self.display_surface.fill(self.black)
+    def start_game(self, num_players):
+        """Starts a game for the given number of players"""
+        self.game.state_manager.get("MainGame").num_players = num_players
+        self.game.state_manager.push("MainGame")
+
+    def checksum(self):
+        """Returns a checksum of the simulation state"""
+        return self.current_entry
+
+    def capture(self):
+        """Returns the currently selected entry, which is all display()
+        needs from the simulation"""
+        return self.current_entry
+
+    def display(self, alpha=0.0, frame=None):
+        """Draw the current frame.  Alpha is the fraction of a timestep (0 to
+        1) that has passed since the last update, for interpolating motion.
+        Frame is what capture() returned after the latest tick"""
+        current_entry = self.capture() if frame is None else frame
 
-        # Show the title text
-        draw_text(self.display_surface,
+        # The selected entry is left off the entries layer, so if the
+        # selection has moved, the layer needs drawing again
+        if current_entry != self.entries_layer_skips:
+            self.entries_layer_skips = current_entry
+            self.invalidate_layer("entries")
+
+        self.compose(current_entry, alpha)
+
+        # Display the changed parts of the drawing canvas on the game window
+        self.blit_to_window()
+    # End display
+
+    def _draw_title(self, surface):
+        """Private method to draw the title layer"""
+        surface.fill(self.black)
+        draw_text(surface,
                   "PONG",
                   pygame.font.get_default_font(), 200,
                   self.display_width // 2,
-                  200, (255, 255, 161))
-
-        # Render the menu entries
-        for idx in range(len(self.entries)):
-            text, y_offset, colour, _ = self.entries[idx]
-
-            # Set the size so the current entry 'pulses'
-            if idx == self.current_entry:
-                size = int(25 + 5 * math.sin(
-                    self.selected_pulse))
-                self.selected_pulse += 2 * self.game.dt
-            else:
-                size = 20
-
-            draw_text(self.display_surface,
-                      text,
-                      pygame.font.get_default_font(), size,
-                      self.display_width // 2,
-                      self.display_height // 2 + y_offset,
-                      colour)
-
-        # Display the drawing canvas on the game window...
-        self.game.display_window.blit(self.display_surface, (0, 0))
-    # End display
+                  200, (255, 255, 161), scale=self.game.render_scale)
+
+    def _draw_entries(self, surface):
+        """Private method to draw the entries layer: every menu entry except
+        the selected one"""
+        for idx, (text, y_offset, colour, _) in enumerate(self.entries):
+            if idx != self.entries_layer_skips:
+                draw_text(surface, text, pygame.font.get_default_font(), 20,
+                          self.display_width // 2,
+                          self.display_height // 2 + y_offset, colour,
+                          scale=self.game.render_scale)
+
+    def _draw_selected(self, surface, current_entry, alpha):
+        """Private method to draw the selected entry, which 'pulses' in
+        size.  Returns the rect it was drawn in"""
+        text, y_offset, colour, _ = self.entries[current_entry]
+        # The pulse follows the game clock, so it keeps the same speed
+        # however often we're drawn
+        self.selected_pulse = 2 * (self.game.game_time
+                                   + alpha * self.game.dt)
+        size = int(25 + 5 * math.sin(self.selected_pulse))
+        return [draw_text(surface, text, pygame.font.get_default_font(), size,
+                          self.display_width // 2,
+                          self.display_height // 2 + y_offset, colour,
+                          scale=self.game.render_scale)]
 
     def startup(self):
         """Perform any state specific initialisation each time the state
@@ -132,6 +149,10 @@ class MainMenu(State):
         etc."""
         super().startup()
 
+        # Get the game's assets off the disk while the player is choosing
+        # what to do, so the game can start without waiting on them
+        self.game.assets.preload_images(["playfield.png"])
+
     def cleanup(self):
         """Perform any cleanup of resources once the state is no longer
         current (e.g. clearing buffers, deallocating resources, etc."""
@@ -0,0 +1,280 @@
+#!/usr/bin/python3
+
+# NetPlay.py
+# Two player games over the network.  The host runs the real game and plays
+# the left paddle; the client plays the right paddle.
+#
+# Every tick the client sends the host its paddle move, along with its last
+# few unacknowledged moves in case any packets went missing.  The host
+# applies them in order, one per tick, and sends back a snapshot of the
+# game's state which says which of the client's moves it has applied.  The
+# client moves its own paddle straight away rather than waiting for the host
+# (input prediction); when a snapshot arrives it takes the host's state, then
+# replays the moves the host hasn't seen yet on top.
+#
+# Snapshots are quantised to fixed point and bit-packed.  They're also delta
+# compressed: each is encoded against the most recent snapshot the client
+# says it has received, with a bitmask saying which fields have changed, and
+# only those fields sent.  Most ticks only the ball and maybe a paddle move,
+# so a snapshot is usually a dozen or so bytes of payload.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import collections
+import struct
+from Network import NetPeer
+
+
+PACKET_INPUT = 1
+INPUT_HEADER = struct.Struct("<IIB")      # newest move's sequence number,
+                                          # newest snapshot tick received,
+                                          # number of moves
+PACKET_SNAPSHOT = 2
+SNAPSHOT_HEADER = struct.Struct("<III")   # tick, baseline tick, sequence
+                                          # number of the last move applied
+NO_BASELINE = 0xFFFFFFFF
+
+MAX_REDUNDANT_MOVES = 32   # Most unacknowledged moves sent in one packet
+SNAPSHOT_HISTORY = 64      # Snapshots kept for use as baselines
+
+# The fields of a snapshot: name, bits, scale and offset.  Each value is
+# stored as round((value + offset) * scale), clamped to fit the bits
+SNAPSHOT_FIELDS = [
+    ("score_p1", 8, 1, 0),
+    ("score_p2", 8, 1, 0),
+    ("running", 1, 1, 0),
+    ("serve_timer", 8, 60, 0),
+    ("ball_x", 14, 8, 128),
+    ("ball_y", 14, 8, 128),
+    ("ball_direction", 15, 64, 0),
+    ("ball_speed", 13, 8, 0),
+    ("paddle_p1_y", 13, 8, 0),
+    ("paddle_p1_move", 2, 1, 1),
+    ("paddle_p2_y", 13, 8, 0),
+    ("paddle_p2_move", 2, 1, 1)
+]
+
+
+class BitWriter:
+    def __init__(self):
+        """Packs values into a byte string, least significant bit first"""
+        self.value = 0
+        self.bits = 0
+
+    def write(self, value, bits):
+        """Appends the low bits of value"""
+        self.value |= (value & ((1 << bits) - 1)) << self.bits
+        self.bits += bits
+
+    def to_bytes(self):
+        """Returns everything written, padded to a whole number of bytes"""
+        return self.value.to_bytes((self.bits + 7) // 8, "little")
+
+
+class BitReader:
+    def __init__(self, data):
+        """Unpacks values written by a BitWriter"""
+        self.value = int.from_bytes(data, "little")
+
+    def read(self, bits):
+        """Returns the next value of the given number of bits"""
+        value = self.value & ((1 << bits) - 1)
+        self.value >>= bits
+        return value
+
+
+def quantise(state):
+    """Converts a dict of snapshot fields to a tuple of fixed point ints"""
+    values = []
+    for name, bits, scale, offset in SNAPSHOT_FIELDS:
+        value = state[name]
+        if name == "ball_direction":
+            value %= 360
+        values.append(min((1 << bits) - 1,
+                          max(0, round((value + offset) * scale))))
+    return tuple(values)
+
+
+def dequantise(values):
+    """Converts a tuple from quantise() back to a dict of snapshot fields"""
+    return {name: value / scale - offset
+            for (name, _, scale, offset), value in zip(SNAPSHOT_FIELDS,
+                                                        values)}
+
+
+def encode_snapshot(tick, baseline_tick, baseline, values, move_ack):
+    """Returns a snapshot packet's payload, with the values delta compressed
+    against the baseline (if there is one)"""
+    writer = BitWriter()
+    changed = [baseline is None or value != old
+               for value, old in zip(values, baseline or values)]
+    for flag in changed:
+        writer.write(flag, 1)
+    for flag, value, (_, bits, _, _) in zip(changed, values,
+                                            SNAPSHOT_FIELDS):
+        if flag:
+            writer.write(value, bits)
+    return SNAPSHOT_HEADER.pack(tick, baseline_tick, move_ack) \
+        + writer.to_bytes()
+
+
+def decode_snapshot(payload, baselines):
+    """Unpacks a snapshot packet's payload.  Returns (tick, move ack,
+    values), or None if we no longer have its baseline"""
+    tick, baseline_tick, move_ack = SNAPSHOT_HEADER.unpack_from(payload)
+    if baseline_tick == NO_BASELINE:
+        baseline = None
+    else:
+        baseline = baselines.get(baseline_tick)
+        if baseline is None:
+            return None
+
+    reader = BitReader(payload[SNAPSHOT_HEADER.size:])
+    changed = [reader.read(1) for _ in SNAPSHOT_FIELDS]
+    values = tuple(reader.read(bits) if flag else baseline[i]
+                   for i, (flag, (_, bits, _, _))
+                   in enumerate(zip(changed, SNAPSHOT_FIELDS)))
+    return tick, move_ack, values
+
+
+def pack_moves(moves):
+    """Bit-packs a list of paddle moves (-1, 0 or 1), two bits each"""
+    writer = BitWriter()
+    for move in moves:
+        writer.write(move + 1, 2)
+    return writer.to_bytes()
+
+
+def unpack_moves(data, count):
+    """Unpacks the moves packed by pack_moves()"""
+    reader = BitReader(data)
+    return [reader.read(2) - 1 for _ in range(count)]
+
+
+class NetHost(NetPeer):
+    is_host = True
+
+    def __init__(self, port, link=None, interface="0.0.0.0"):
+        """Sets up the host end of a game, listening on the given port.  The
+        first client to send us a packet becomes the other player"""
+        super().__init__((interface, port), link=link)
+
+        # The client's moves we've received but not yet applied, as
+        # (sequence number, move) pairs
+        self.moves = collections.deque()
+        self.newest_move = 0    # Sequence number of the newest move queued
+        self.move_ack = 0       # Sequence number of the last move applied
+        self.last_move = 0
+
+        # If the client gets this many moves ahead of us, then skip some so
+        # that its input doesn't lag further and further behind
+        self.max_queued_moves = 4
+
+        self.snapshot_ack = None   # Newest snapshot the client has received
+        self.sent = collections.OrderedDict()   # Tick -> quantised values
+
+    def poll(self):
+        """Queues any new moves which have arrived from the client"""
+        for packet_type, payload in self.receive():
+            if packet_type != PACKET_INPUT:
+                continue
+            newest, snapshot_ack, count = INPUT_HEADER.unpack_from(payload)
+            moves = unpack_moves(payload[INPUT_HEADER.size:], count)
+            for sequence, move in enumerate(moves, newest - count + 1):
+                if sequence > self.newest_move:
+                    self.moves.append((sequence, move))
+                    self.newest_move = sequence
+            if snapshot_ack != NO_BASELINE and (
+                    self.snapshot_ack is None
+                    or snapshot_ack > self.snapshot_ack):
+                self.snapshot_ack = snapshot_ack
+
+    def next_move(self):
+        """Returns the client's paddle move for this tick.  If its next move
+        hasn't arrived yet, then it's assumed to be the same as the last"""
+        self.poll()
+        while len(self.moves) > self.max_queued_moves:
+            self.move_ack, self.last_move = self.moves.popleft()
+        if self.moves:
+            self.move_ack, self.last_move = self.moves.popleft()
+        return self.last_move
+
+    def send_snapshot(self, tick, state):
+        """Sends the client the game's state after the given tick.  State is
+        a dict holding each of the SNAPSHOT_FIELDS"""
+        values = quantise(state)
+        baseline = self.sent.get(self.snapshot_ack)
+        baseline_tick = NO_BASELINE if baseline is None else self.snapshot_ack
+
+        self.sent[tick] = values
+        while len(self.sent) > SNAPSHOT_HISTORY:
+            self.sent.popitem(last=False)
+
+        self.send(PACKET_SNAPSHOT, encode_snapshot(tick, baseline_tick,
+                                                   baseline, values,
+                                                   self.move_ack))
+
+
+class NetClient(NetPeer):
+    def __init__(self, host_addr, link=None, local_port=0):
+        """Sets up the client end of a game, playing against the host at the
+        given (address, port)"""
+        super().__init__(("0.0.0.0", local_port), remote_addr=host_addr,
+                         link=link)
+
+        self.move_sequence = 0
+        self.pending = collections.deque()   # (sequence, move) not yet acked
+
+        self.received = collections.OrderedDict()  # Tick -> quantised values
+        self.newest_tick = None
+
+    def send_input(self, move):
+        """Sends our paddle move for this tick to the host, along with any
+        the host hasn't acknowledged yet"""
+        self.move_sequence += 1
+        self.pending.append((self.move_sequence, move))
+        while len(self.pending) > MAX_REDUNDANT_MOVES:
+            self.pending.popleft()
+
+        snapshot_ack = NO_BASELINE if self.newest_tick is None \
+            else self.newest_tick
+        self.send(PACKET_INPUT,
+                  INPUT_HEADER.pack(self.move_sequence, snapshot_ack,
+                                    len(self.pending))
+                  + pack_moves([move for _, move in self.pending]))
+
+    def poll(self):
+        """Returns the newest snapshot to have arrived, as a dict of the
+        SNAPSHOT_FIELDS, or None if there isn't a new one"""
+        newest = None
+        for packet_type, payload in self.receive():
+            if packet_type != PACKET_SNAPSHOT:
+                continue
+            decoded = decode_snapshot(payload, self.received)
+            if decoded is None:
+                continue
+
+            tick, move_ack, values = decoded
+            self.received[tick] = values
+            while len(self.received) > SNAPSHOT_HISTORY:
+                self.received.popitem(last=False)
+
+            if self.newest_tick is None or tick > self.newest_tick:
+                self.newest_tick = tick
+                newest = (values, move_ack)
+
+        if newest is None:
+            return None
+
+        # The host has applied everything up to move_ack, so those moves
+        # are already in the snapshot
+        values, move_ack = newest
+        while self.pending and self.pending[0][0] <= move_ack:
+            self.pending.popleft()
+        return dequantise(values)
+
+    def pending_moves(self):
+        """Returns the moves we've made which the newest snapshot doesn't
+        include yet, oldest first"""
+        return [move for _, move in self.pending]
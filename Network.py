@@ -0,0 +1,325 @@
+#!/usr/bin/python3
+
+# Network.py
+# The transport for network play.  Packets are sent over UDP using asyncio,
+# with the event loop running on its own thread so that it carries on
+# alongside the game's main loop: the game queues packets with send() and
+# collects whatever has arrived with receive(), and never waits on the
+# network.
+#
+# Every packet starts with a small header carrying a sequence number (so we
+# can count lost packets) and a millisecond timestamp.  Each side echoes back
+# the last timestamp it received along with how long it held onto it, which
+# gives us the round trip time without the two clocks having to agree.
+#
+# LossyLink can be put between a peer and its socket to add latency, jitter
+# and packet loss, so the game can be tried out over loopback as if it were
+# on a poor network.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import asyncio
+import collections
+import random
+import struct
+import threading
+import time
+
+
+PROTOCOL_ID = 0x50
+PACKET_HEADER = struct.Struct("<BBHIIH")   # protocol id, packet type,
+                                           # sequence, timestamp, echoed
+                                           # timestamp, echo hold time (the
+                                           # times are all in milliseconds)
+
+
+class NetStats:
+    def __init__(self):
+        """Initialises the counters"""
+        self.rtt = None         # Smoothed round trip time, in seconds
+        self.jitter = 0.0       # Mean variation between RTT samples
+        self.last_rtt = None    # The most recent RTT sample
+
+        self.packets_sent = 0
+        self.packets_received = 0
+        self.packets_lost = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+        # Bandwidth in bytes per second, measured over the last second
+        self.send_rate = 0.0
+        self.receive_rate = 0.0
+        self.window_start = time.perf_counter()
+        self.window_sent = 0
+        self.window_received = 0
+
+    def add_rtt_sample(self, rtt):
+        """Folds a new round trip time into the averages, in the same way as
+        TCP and RTP do"""
+        if self.rtt is None:
+            self.rtt = rtt
+        else:
+            self.jitter += (abs(rtt - self.last_rtt) - self.jitter) / 16
+            self.rtt += (rtt - self.rtt) / 8
+        self.last_rtt = rtt
+
+    def count_sent(self, size):
+        """Counts a packet of the given size in bytes going out"""
+        self.packets_sent += 1
+        self.bytes_sent += size
+        self.window_sent += size
+        self._roll_window()
+
+    def count_received(self, size):
+        """Counts a packet of the given size in bytes coming in"""
+        self.packets_received += 1
+        self.bytes_received += size
+        self.window_received += size
+        self._roll_window()
+
+    def summary(self):
+        """Returns the counters as a line of text"""
+        rtt = "-" if self.rtt is None else f"{self.rtt * 1000:.1f}ms"
+        return (f"rtt {rtt}, jitter {self.jitter * 1000:.1f}ms, "
+                f"sent {self.packets_sent} ({self.bytes_sent} bytes, "
+                f"{self.send_rate / 1024:.1f}KB/s), received "
+                f"{self.packets_received} ({self.bytes_received} bytes, "
+                f"{self.receive_rate / 1024:.1f}KB/s), "
+                f"lost {self.packets_lost}")
+
+    def _roll_window(self):
+        """Private method to update the bandwidth figures once a second"""
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.send_rate = self.window_sent / elapsed
+            self.receive_rate = self.window_received / elapsed
+            self.window_start = now
+            self.window_sent = self.window_received = 0
+
+
+class LossyLink:
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        """Simulates a poor network connection for outgoing packets.
+
+        Parameters
+        ----------
+        latency : float
+            How long (in seconds) to hold each packet before sending it
+        jitter : float
+            The most (in seconds) the latency varies by either way.  Packets
+            can arrive out of order if this is large enough
+        loss : float
+            The fraction of packets (0 to 1) to drop altogether
+        seed : int
+            Seed for the random number generator, for repeatable runs
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.dropped = 0
+
+    def send(self, loop, transport, data, addr):
+        """Sends a packet, after a delay, or not at all"""
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+
+        delay = max(0.0, self.latency
+                    + self.rng.uniform(-self.jitter, self.jitter))
+        if delay:
+            loop.call_later(delay, self._deliver, transport, data, addr)
+        else:
+            transport.sendto(data, addr)
+
+    def _deliver(self, transport, data, addr):
+        """Private method to send a delayed packet, if we're still open"""
+        if not transport.is_closing():
+            transport.sendto(data, addr)
+
+
+class NetPeer(asyncio.DatagramProtocol):
+    is_host = False
+
+    def __init__(self, local_addr, remote_addr=None, link=None):
+        """Initialises one end of a connection.  Nothing happens on the
+        network until start() is called.
+
+        Parameters
+        ----------
+        local_addr : tuple
+            The (address, port) to listen on.  Port 0 picks a free one
+        remote_addr : tuple
+            The (address, port) of the other end.  If not given, then it's
+            whoever sends us the first packet
+        link : LossyLink
+            Simulated network conditions to send through, if any
+        """
+        self.local_addr = local_addr
+        self.remote_addr = remote_addr
+        self.link = link
+        self.stats = NetStats()
+        self.timeout = 2.0    # Seconds of silence before we're disconnected
+
+        # How long a client waits to first hear from the host before giving
+        # up.  A host waits for as long as it takes for someone to join
+        self.join_timeout = 10.0
+        self.start_time = None
+
+        # Received (packet type, payload) pairs waiting for the game.  Deques
+        # can be appended and popped from different threads safely
+        self.inbox = collections.deque()
+
+        self.loop = None
+        self.transport = None
+        self.thread = None
+        self.started = threading.Event()
+        self.error = None
+
+        self.epoch = time.perf_counter()
+        self.sequence = 0           # Sequence number of our next packet
+        self.remote_sequence = None # Highest sequence number received
+        self.echo_time = 0          # The other end's last timestamp
+        self.echo_received = 0      # When we received it
+        self.last_heard = None
+
+    def start(self):
+        """Opens the socket and starts the network thread.  Raises OSError
+        if the socket can't be opened (e.g. the port is in use)"""
+        self.start_time = time.perf_counter()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="network",
+                                       daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Closes the socket and stops the network thread"""
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self._shutdown)
+            self.thread.join()
+
+    def send(self, packet_type, payload):
+        """Queues a packet to be sent to the other end.  Can be called from
+        any thread"""
+        self.loop.call_soon_threadsafe(self._send, packet_type, payload)
+
+    def receive(self):
+        """Returns a list of the (packet type, payload) pairs which have
+        arrived since the last call"""
+        packets = []
+        while self.inbox:
+            packets.append(self.inbox.popleft())
+        return packets
+
+    @property
+    def connected(self):
+        """Whether we've heard from the other end recently"""
+        return self.last_heard is not None and \
+            time.perf_counter() - self.last_heard < self.timeout
+
+    @property
+    def timed_out(self):
+        """Whether we've given up on the other end: we've heard from it but
+        it has since gone quiet, or we're a client and the host never
+        answered"""
+        if self.last_heard is None:
+            return not self.is_host and self.start_time is not None and \
+                time.perf_counter() - self.start_time >= self.join_timeout
+        return not self.connected
+
+    def connection_made(self, transport):
+        """Called by asyncio once the socket is open"""
+        self.transport = transport
+        self.local_addr = transport.get_extra_info("sockname")
+
+    def datagram_received(self, data, addr):
+        """Called by asyncio for every packet that arrives"""
+        if len(data) < PACKET_HEADER.size or data[0] != PROTOCOL_ID:
+            return
+        if self.remote_addr is None:
+            self.remote_addr = addr
+        elif addr != self.remote_addr:
+            return
+
+        _, packet_type, sequence, timestamp, echo, hold = \
+            PACKET_HEADER.unpack_from(data)
+        now = self._now_ms()
+        self.last_heard = time.perf_counter()
+        self.stats.count_received(len(data))
+
+        if echo:
+            rtt = ((now - echo) & 0xFFFFFFFF) - hold
+            if rtt >= 0:
+                self.stats.add_rtt_sample(rtt / 1000)
+        self.echo_time = timestamp
+        self.echo_received = now
+
+        # Any gap in the sequence numbers is lost packets, until proven
+        # otherwise by one turning up late
+        if self.remote_sequence is None:
+            self.remote_sequence = sequence
+        else:
+            gap = (sequence - self.remote_sequence) & 0xFFFF
+            if gap < 0x8000:
+                self.stats.packets_lost += gap - 1
+                self.remote_sequence = sequence
+            elif self.stats.packets_lost:
+                self.stats.packets_lost -= 1
+
+        self.inbox.append((packet_type, data[PACKET_HEADER.size:]))
+
+    def error_received(self, exc):
+        """Called by asyncio if a send fails, e.g. because the other end
+        isn't listening yet.  UDP is unreliable anyway, so carry on"""
+        pass
+
+    def _run(self):
+        """Private method which runs the event loop on the network thread"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.loop.create_datagram_endpoint(
+                lambda: self, local_addr=self.local_addr))
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            self.loop.close()
+            return
+
+        self.started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def _shutdown(self):
+        """Private method to close the socket from the network thread"""
+        if self.transport is not None:
+            self.transport.close()
+        self.loop.stop()
+
+    def _send(self, packet_type, payload):
+        """Private method to send a packet from the network thread"""
+        if self.transport is None or self.remote_addr is None:
+            return
+
+        now = self._now_ms()
+        hold = min(0xFFFF, (now - self.echo_received) & 0xFFFFFFFF) \
+            if self.echo_time else 0
+        data = PACKET_HEADER.pack(PROTOCOL_ID, packet_type, self.sequence,
+                                  now, self.echo_time, hold) + payload
+        self.sequence = (self.sequence + 1) & 0xFFFF
+        self.stats.count_sent(len(data))
+
+        if self.link is not None:
+            self.link.send(self.loop, self.transport, data, self.remote_addr)
+        else:
+            self.transport.sendto(data, self.remote_addr)
+
+    def _now_ms(self):
+        """Private method returning our clock in milliseconds.  Never 0,
+        since that means 'no timestamp' in the header"""
+        return (int((time.perf_counter() - self.epoch) * 1000) + 1) \
+            & 0xFFFFFFFF or 1
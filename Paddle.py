@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+# Paddle.py
+# A player's paddle.  Whoever controls the paddle (the keyboard or the AI)
+# sets the move property; the paddle then travels up or down at its top
+# speed, stopping at the walls.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+from Actor import Actor
+
+
+class Paddle(Actor):
+    __slots__ = ("move", "top_limit", "bottom_limit", "max_speed")
+    snapshot_attributes = Actor.snapshot_attributes + (
+        ("move", "b"), ("top_limit", "d"), ("bottom_limit", "d"),
+        ("max_speed", "d"))
+
+    def reset(self):
+        """Puts the paddle back into its freshly created condition"""
+        super().reset()
+        self.move = 0          # -1 to move up, 1 to move down, 0 to stop
+        self.top_limit = 0     # The inside edges of the top and bottom walls
+        self.bottom_limit = 0
+        self.max_speed = 480
+
+    def create(self):
+        """Code that executes when an instance of the object is created"""
+        self.width = 16
+        self.height = 96
+        self.solid = self.visible = True
+
+    def steer(self, move):
+        """Starts the paddle moving up (-1) or down (1), or stops it (0)"""
+        self.move = move
+        self.direction = 270 if move > 0 else 90
+        self.speed = self.max_speed if move else 0
+
+    def update(self):
+        """Stop at the walls"""
+        if self.y < self.top_limit:
+            self.y = self.top_limit
+        elif self.y + self.height > self.bottom_limit:
+            self.y = self.bottom_limit - self.height
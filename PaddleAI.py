@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+# PaddleAI.py
+# The computer opponent.  Rather than simulating the ball forward tick by
+# tick, we work out where it will cross the paddle's line in one go: ignoring
+# the walls, the ball travels in a straight line, and each bounce off a wall
+# is a reflection, so 'unfolding' the arena turns the bounces into a simple
+# modulo.  The prediction only changes when the ball hits something, so it's
+# cached until then and most ticks cost no more than a comparison.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import struct
+
+
+# Reaction delay (in seconds) and aiming error (standard deviation in pixels)
+# for each difficulty level
+DIFFICULTY = {
+    "easy": (0.30, 60.0),
+    "normal": (0.15, 25.0),
+    "hard": (0.05, 5.0)
+}
+
+# The controller's state in a snapshot: reaction delay, error, bounce count
+# last seen (-1 for none), time waited, whether the target is stale, whether
+# there's a target, and the target
+SNAPSHOT = struct.Struct("<ddqd??d")
+
+
+def predict_intercept(x, y, vx, vy, line_x, top, bottom):
+    """Returns the y coordinate at which a point moving in a straight line
+    will cross a vertical line, allowing for reflections off horizontal
+    walls, or None if it's moving away from the line
+
+    Parameters
+    ----------
+    x, y : float
+        The current position of the point
+    vx, vy : float
+        The point's velocity
+    line_x : float
+        The x coordinate of the line
+    top, bottom : float
+        The y coordinates the point bounces between
+    """
+    if vx == 0 or (line_x - x) / vx < 0:
+        return None
+
+    height = bottom - top
+    if height <= 0:
+        return top
+
+    # Where we'd be with no walls, folded back into the arena
+    unfolded = (y - top + vy * (line_x - x) / vx) % (2 * height)
+    if unfolded > height:
+        unfolded = 2 * height - unfolded
+    return top + unfolded
+
+
+class PaddleAI:
+    def __init__(self, paddle, ball, rng, difficulty="normal"):
+        """Initialises the controller.
+
+        Parameters
+        ----------
+        paddle : Paddle
+            The paddle we're controlling
+        ball : Ball
+            The ball we're trying to hit
+        rng : random.Random
+            Where to take the aiming error from.  Use the game's generator so
+            that replays stay deterministic
+        difficulty : str
+            One of the keys of DIFFICULTY
+        """
+        self.paddle = paddle
+        self.ball = ball
+        self.paddle_half_height = paddle.height / 2
+        self.rng = rng
+        self.reaction_delay, self.error = DIFFICULTY[difficulty]
+
+        # How close (in pixels) the paddle's centre needs to be to the
+        # target before we stop moving.  Stops the paddle jittering
+        self.dead_zone = 4
+
+        self.seen_bounces = None  # The ball's bounce count when we last looked
+        self.waiting = 0.0        # Time since the ball last changed course
+        self.stale = True         # Whether the target needs recalculating
+        self.target = None        # Where we want the centre of the paddle
+
+    def set_difficulty(self, difficulty):
+        """Changes the reaction delay and error to those of the given level"""
+        self.reaction_delay, self.error = DIFFICULTY[difficulty]
+
+    def snapshot(self):
+        """Returns the controller's state as bytes"""
+        return SNAPSHOT.pack(self.reaction_delay, self.error,
+                             -1 if self.seen_bounces is None
+                             else self.seen_bounces,
+                             self.waiting, self.stale,
+                             self.target is not None,
+                             self.target or 0.0)
+
+    def restore(self, data, offset=0):
+        """Puts back the state from bytes returned by snapshot(), starting
+        at the given offset.  Returns the offset of the first byte after"""
+        (self.reaction_delay, self.error, seen_bounces, self.waiting,
+         self.stale, has_target, target) = SNAPSHOT.unpack_from(data, offset)
+        self.seen_bounces = None if seen_bounces < 0 else seen_bounces
+        self.target = target if has_target else None
+        return offset + SNAPSHOT.size
+
+    def predict(self):
+        """Returns the y coordinate at which the centre of the ball will
+        reach the paddle, or None if it's heading away from us"""
+        ball, paddle = self.ball, self.paddle
+        vx, vy = ball.velocity()
+        half_width, half_height = ball.width / 2, ball.height / 2
+
+        # The ball's centre is level with the paddle's face when it hits
+        if paddle.x > ball.x:
+            line_x = paddle.x - half_width
+        else:
+            line_x = paddle.x + paddle.width + half_width
+
+        return predict_intercept(ball.x + half_width, ball.y + half_height,
+                                 vx, vy, line_x,
+                                 ball.top_limit + half_height,
+                                 ball.bottom_limit - half_height)
+
+    def update(self, dt):
+        """Works out which way the paddle should move this tick, and tells
+        the paddle.  Returns the move given (-1 up, 1 down or 0)"""
+        # The prediction only changes when the ball hits something, at which
+        # point we wait for our reaction time before acting on it
+        if self.ball.bounces != self.seen_bounces:
+            self.seen_bounces = self.ball.bounces
+            self.waiting = 0.0
+            self.stale = True
+
+        if self.stale:
+            self.waiting += dt
+            if self.waiting >= self.reaction_delay:
+                self.stale = False
+                target = self.predict()
+                if target is None:
+                    # Heading away, so drift back to the middle
+                    target = (self.ball.top_limit + self.ball.bottom_limit) / 2
+                elif self.error:
+                    target += self.rng.gauss(0, self.error)
+                self.target = target
+
+        move = 0
+        if self.target is not None:
+            offset = self.target - (self.paddle.y + self.paddle_half_height)
+            if offset > self.dead_zone:
+                move = 1
+            elif offset < -self.dead_zone:
+                move = -1
+
+        if move != self.paddle.move:
+            self.paddle.steer(move)
+        return move
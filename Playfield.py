@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+# Playfield.py
+# Works out where the solid parts of a playfield image are, so that the game
+# logic can use the same walls as are drawn rather than having them written
+# into the code.  The image is thresholded into a pygame mask, the mask is
+# split into its connected regions, and each region is broken down into a few
+# axis-aligned rectangles (usually just the one) for collision tests.
+#
+# Analysing an image takes a few milliseconds, so the rectangles are cached
+# on disk next to it, keyed on a hash of the image's contents, and only
+# worked out again when the image changes.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import hashlib
+import json
+import os
+import pygame
+
+
+def find_regions(surface, threshold=128):
+    """Returns the solid parts of an image as a list of pygame.Rects, sorted
+    top to bottom and then left to right.
+
+    Parameters
+    ----------
+    surface : pygame.Surface
+        The image.  Anything at least as bright as the threshold in every
+        colour channel counts as solid
+    threshold : int
+        The brightness (0-255) which separates solid from background
+    """
+    level = 256 - threshold
+    mask = pygame.mask.from_threshold(surface, (255, 255, 255),
+                                      (level, level, level, 255))
+
+    rects = []
+    for component in mask.connected_components():
+        bounds = component.get_bounding_rects()[0]
+        if component.count() == bounds.width * bounds.height:
+            rects.append(bounds)
+        else:
+            rects.extend(_split_into_rects(component, bounds))
+    rects.sort(key=lambda rect: (rect.y, rect.x))
+    return rects
+
+
+def load_regions(path, threshold=128):
+    """Returns the image's size and its solid regions (see find_regions()),
+    from the cache if the image hasn't changed since it was last analysed.
+    The cache is kept in a .regions.json file next to the image"""
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    cache_path = os.path.splitext(path)[0] + ".regions.json"
+
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        if cache["hash"] == digest and cache["threshold"] == threshold:
+            return (tuple(cache["size"]),
+                    [pygame.Rect(rect) for rect in cache["regions"]])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    surface = pygame.image.load(path)
+    regions = find_regions(surface, threshold)
+    cache = {"hash": digest, "threshold": threshold,
+             "size": list(surface.get_size()),
+             "regions": [list(rect) for rect in regions]}
+    try:
+        with open(cache_path, "w") as cache_file:
+            json.dump(cache, cache_file)
+    except OSError:
+        # Not being able to cache it just means analysing it again next time
+        pass
+    return surface.get_size(), regions
+
+
+def _split_into_rects(mask, bounds):
+    """Private function to break a region which isn't a simple rectangle
+    into rectangles.  Each row is split into runs of solid pixels, and a run
+    which lines up exactly with one on the row above extends its rectangle
+    downwards"""
+    rects = []
+    growing = {}    # (left, right) of a run -> its rectangle so far
+    for y in range(bounds.top, bounds.bottom):
+        runs = set()
+        x = bounds.left
+        while x < bounds.right:
+            if mask.get_at((x, y)):
+                start = x
+                while x < bounds.right and mask.get_at((x, y)):
+                    x += 1
+                runs.add((start, x))
+            else:
+                x += 1
+
+        for span in list(growing):
+            if span not in runs:
+                rects.append(growing.pop(span))
+        for left, right in runs:
+            if (left, right) in growing:
+                growing[(left, right)].height += 1
+            else:
+                growing[(left, right)] = pygame.Rect(left, y, right - left, 1)
+
+    rects.extend(growing.values())
+    return rects
@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+
+# Profiler.py
+# An opt-in frame profiler.  The main loop tells the profiler when each frame
+# starts and ends and brackets each phase of the frame (input, update,
+# display, present) with begin()/end() calls.  The last few hundred frames
+# are kept in a ring buffer, which can be summarised in an on-screen overlay
+# or exported as a Chrome trace (load it at chrome://tracing or in Perfetto)
+# to look at hitches after the fact.
+#
+# The main loop only calls into the profiler when it's enabled, so leaving
+# it switched off costs nothing more than a few boolean tests per frame.
+#
+# RateMeter counts how many times a second something happens, e.g. ticks of
+# the simulation or frames drawn, and CpuMeter how much CPU time the process
+# uses for each second that goes by.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+from collections import deque
+import json
+import time
+import pygame
+from TextCache import text_cache
+
+
+class FrameProfiler:
+    def __init__(self, history=300):
+        """Initialises a disabled profiler.
+
+        Parameters
+        ----------
+        history : int
+            The number of frames to keep in the ring buffer
+        """
+        self.enabled = False
+        self.show_overlay = True
+
+        # Each frame is recorded as a tuple of (start, duration, ticks,
+        # events), where events is a list of (name, start, duration) for the
+        # phases of the frame.  All times are in nanoseconds
+        self.frames = deque(maxlen=history)
+
+        self._frame_start = 0
+        self._ticks = 0
+        self._events = []
+        self._open = []
+
+        # The overlay text is only refreshed a few times a second, otherwise
+        # it changes too quickly to read (and fills the text cache)
+        self.overlay_interval = 0.25
+        self._overlay_lines = []
+        self._overlay_updated = 0.0
+        self.overlay_font = pygame.font.get_default_font()
+        self.overlay_size = 16
+
+    def begin_frame(self):
+        """Marks the start of a frame"""
+        self._frame_start = time.perf_counter_ns()
+        self._ticks = 0
+        self._events = []
+
+    def end_frame(self):
+        """Marks the end of a frame and adds it to the ring buffer"""
+        now = time.perf_counter_ns()
+        self.frames.append((self._frame_start, now - self._frame_start,
+                            self._ticks, self._events))
+
+    def begin(self, name):
+        """Marks the start of a named phase within the frame.  Phases can be
+        nested, and each must be closed by a call to end()"""
+        self._open.append((name, time.perf_counter_ns()))
+
+    def end(self):
+        """Marks the end of the most recently begun phase"""
+        name, start = self._open.pop()
+        self._events.append((name, start, time.perf_counter_ns() - start))
+
+    def count_tick(self):
+        """Records that a simulation tick was run during this frame"""
+        self._ticks += 1
+
+    def stats(self):
+        """Returns a dictionary summarising the frames in the ring buffer:
+        the frame rate, the median and 99th percentile frame times (in
+        milliseconds) and the average number of ticks per frame"""
+        if len(self.frames) < 2:
+            return {"fps": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "ticks": 0.0}
+
+        durations = sorted(frame[1] for frame in self.frames)
+        span = (self.frames[-1][0] + self.frames[-1][1]) - self.frames[0][0]
+        return {
+            "fps": len(self.frames) * 1e9 / span if span else 0.0,
+            "p50_ms": durations[len(durations) // 2] / 1e6,
+            "p99_ms": durations[min(len(durations) - 1,
+                                    int(len(durations) * 0.99))] / 1e6,
+            "ticks": sum(frame[2] for frame in self.frames) / len(self.frames)
+        }
+
+    def draw_overlay(self, surface, scale=1.0):
+        """Draws the statistics in the top left corner of the surface.
+        Returns the area drawn over, so that it can be marked dirty.  The
+        overlay's size is for a full size frame, and is multiplied by scale
+        (the game's render_scale) so that it covers the same part of a
+        smaller one"""
+        now = time.perf_counter()
+        if now - self._overlay_updated >= self.overlay_interval:
+            self._overlay_updated = now
+            stats = self.stats()
+            self._overlay_lines = [
+                f"FPS {stats['fps']:6.1f}",
+                f"p50 {stats['p50_ms']:6.2f} ms",
+                f"p99 {stats['p99_ms']:6.2f} ms",
+                f"ticks/frame {stats['ticks']:4.2f}"
+            ]
+
+        size = max(1, round(self.overlay_size * scale))
+        line_height = size + max(1, round(2 * scale))
+        margin = max(1, round(4 * scale))
+        area = pygame.Rect(0, 0, round(160 * scale),
+                           line_height * len(self._overlay_lines) + 2 * margin)
+        surface.fill((0, 0, 0), area)
+        for i, line in enumerate(self._overlay_lines):
+            text = text_cache.render(line, self.overlay_font, size,
+                                     (0, 255, 0))
+            surface.blit(text, (margin, margin + i * line_height))
+        return area
+
+    def export_chrome_trace(self, filename):
+        """Writes the frames in the ring buffer to a JSON file in the Chrome
+        trace event format"""
+        events = []
+        for start, duration, ticks, phases in self.frames:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": start / 1000, "dur": duration / 1000})
+            events.append({"name": "ticks", "ph": "C", "pid": 1, "tid": 1,
+                           "ts": start / 1000, "args": {"ticks": ticks}})
+            for name, phase_start, phase_duration in phases:
+                events.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": phase_start / 1000,
+                               "dur": phase_duration / 1000})
+
+        with open(filename, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"},
+                      trace_file)
+
+
+class RateMeter:
+    def __init__(self, window=1.0):
+        """Measures how often count() is called, averaged over each window
+        seconds"""
+        self.window = window
+        self.rate = 0.0
+        self.total = 0
+        self.count_in_window = 0
+        self.window_start = time.perf_counter()
+
+    def count(self):
+        """Records one occurrence"""
+        self.total += 1
+        self.count_in_window += 1
+        now = time.perf_counter()
+        if now - self.window_start >= self.window:
+            self.rate = self.count_in_window / (now - self.window_start)
+            self.count_in_window = 0
+            self.window_start = now
+
+
+class CpuMeter:
+    def __init__(self, window=1.0):
+        """Measures how many seconds of CPU time the process uses for each
+        second of wall clock time, averaged over each window seconds.  1.0
+        means it's keeping a whole core busy.  Every thread counts"""
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """Starts measuring again from now"""
+        self.usage = 0.0
+        self.started = self.window_start = time.perf_counter()
+        self.cpu_started = self.cpu_window_start = time.process_time()
+
+    def sample(self):
+        """Updates usage once the current window is over.  Should be called
+        regularly (e.g. once per frame)"""
+        now = time.perf_counter()
+        if now - self.window_start >= self.window:
+            cpu = time.process_time()
+            self.usage = (cpu - self.cpu_window_start) \
+                / (now - self.window_start)
+            self.window_start = now
+            self.cpu_window_start = cpu
+
+    def average(self):
+        """Returns the CPU time per second since the meter was created"""
+        elapsed = time.perf_counter() - self.started
+        if elapsed <= 0:
+            return 0.0
+        return (time.process_time() - self.cpu_started) / elapsed
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+# RenderTargetPool.py
+# A pool of off-screen drawing surfaces.  States borrow their drawing canvases
+# from here rather than allocating a fresh one every time they start up, and
+# hand them back when they clean up so the next state can reuse the memory.
+# Surfaces are converted to the display's pixel format when they're created,
+# so blitting them to the window never needs a format conversion.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import pygame
+
+
+class RenderTargetPool:
+    def __init__(self):
+        """Initialises an empty pool.  Note that surfaces can only be created
+        once the display mode has been set"""
+        # Free surfaces, keyed on ((width, height), alpha)
+        self.free = {}
+
+        # Statistics so we can see how much reuse we're getting
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, size, alpha=False):
+        """Returns a surface of the given size in the display format.  If
+        alpha is True, then the surface has per-pixel alpha.  The contents of
+        a reused surface are whatever its last user left in it
+
+        Parameters
+        ----------
+        size : (int, int)
+            The width and height of the surface we want
+        alpha : bool
+            Whether the surface needs per-pixel alpha
+        """
+        key = ((int(size[0]), int(size[1])), alpha)
+        free_list = self.free.get(key)
+        if free_list:
+            self.reuses += 1
+            return free_list.pop()
+
+        self.allocations += 1
+        if alpha:
+            return pygame.Surface(key[0], pygame.SRCALPHA).convert_alpha()
+        return pygame.Surface(key[0]).convert()
+
+    def release(self, surface):
+        """Returns a surface to the pool so it can be handed out again.  The
+        caller must not draw on it afterwards"""
+        alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        key = (surface.get_size(), alpha)
+        self.free.setdefault(key, []).append(surface)
+
+    def trim(self, max_bytes=0):
+        """Drops free surfaces, largest first, until those left in the pool
+        hold no more than max_bytes"""
+        free = sorted(((s.get_pitch() * s.get_height(), key, s)
+                       for key, free_list in self.free.items()
+                       for s in free_list), key=lambda item: item[0])
+        held = sum(size for size, _, _ in free)
+        while held > max_bytes and free:
+            size, key, surface = free.pop()
+            self.free[key].remove(surface)
+            if not self.free[key]:
+                del self.free[key]
+            held -= size
+
+    def clear(self):
+        """Drops all of the free surfaces so their memory can be reclaimed"""
+        self.free.clear()
+
+    def free_bytes(self):
+        """Returns the number of bytes held by surfaces sitting in the pool"""
+        return sum(s.get_pitch() * s.get_height()
+                   for free_list in self.free.values() for s in free_list)
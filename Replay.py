@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+
+# Replay.py
+# Recording and playback of the input to the fixed-step simulation.  Since
+# every tick advances the game by the same dt, the game is entirely
+# determined by its random seed and the input seen on each tick, so that's
+# all we need to record to reproduce a session exactly.
+#
+# The log is a small binary file.  A header holds the seed, the timestep and
+# how often checksums were taken, followed by a stream of records.  Input is
+# run-length encoded (one record covers any number of ticks with identical
+# input), and every so often a checksum of the game's state is recorded so
+# that playback can tell if it has diverged from the original session.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import struct
+
+
+MAGIC = b"PONGREPL"
+HEADER = struct.Struct("<8sHQdI")          # magic, version, seed, dt,
+                                           # checksum interval
+VERSION = 2
+
+RECORD_INPUT = 1
+INPUT_RECORD = struct.Struct("<BIIII")     # type, held, pressed, released,
+                                           # number of ticks
+RECORD_CHECKSUM = 2
+CHECKSUM_RECORD = struct.Struct("<BII")    # type, tick, checksum
+
+
+class ReplayDivergenceError(Exception):
+    """Raised when a replayed game's state doesn't match the recording"""
+    pass
+
+
+class ReplayRecorder:
+    def __init__(self, filename, seed, dt, checksum_interval=60):
+        """Opens a new replay log and writes its header.
+
+        Parameters
+        ----------
+        filename : str
+            The file to write the log to
+        seed : int
+            The seed the game's random number generator was given
+        dt : float
+            The length of each simulation tick
+        checksum_interval : int
+            How many ticks between checksums of the game state
+        """
+        self.checksum_interval = checksum_interval
+        self.file = open(filename, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, dt,
+                                    checksum_interval))
+
+        # The input run we're currently building up
+        self.run_input = None
+        self.run_length = 0
+
+    def record_input(self, held, pressed, released):
+        """Records the input masks seen by one tick"""
+        tick_input = (held, pressed, released)
+        if tick_input == self.run_input:
+            self.run_length += 1
+        else:
+            self._flush_run()
+            self.run_input = tick_input
+            self.run_length = 1
+
+    def record_checksum(self, tick, checksum):
+        """Records the game's checksum after the given tick"""
+        self._flush_run()
+        self.file.write(CHECKSUM_RECORD.pack(RECORD_CHECKSUM, tick,
+                                             checksum & 0xFFFFFFFF))
+
+    def close(self):
+        """Writes out anything outstanding and closes the log"""
+        self._flush_run()
+        self.file.close()
+
+    def _flush_run(self):
+        """Private method to write the current input run to the log"""
+        if self.run_length:
+            self.file.write(INPUT_RECORD.pack(RECORD_INPUT, *self.run_input,
+                                              self.run_length))
+        self.run_input = None
+        self.run_length = 0
+
+
+class ReplayPlayer:
+    def __init__(self, filename):
+        """Loads a replay log for playback"""
+        with open(filename, "rb") as replay_file:
+            data = replay_file.read()
+
+        magic, version, self.seed, self.dt, self.checksum_interval = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{filename} is not a replay log this version "
+                             f"of the game can read")
+
+        # The input runs, and checksums keyed by tick
+        self.runs = []
+        self.checksums = {}
+        offset = HEADER.size
+        while offset < len(data):
+            if data[offset] == RECORD_INPUT:
+                _, held, pressed, released, count = \
+                    INPUT_RECORD.unpack_from(data, offset)
+                self.runs.append(((held, pressed, released), count))
+                offset += INPUT_RECORD.size
+            elif data[offset] == RECORD_CHECKSUM:
+                _, tick, checksum = CHECKSUM_RECORD.unpack_from(data, offset)
+                self.checksums[tick] = checksum
+                offset += CHECKSUM_RECORD.size
+            else:
+                raise ValueError(f"{filename} is corrupt at byte {offset}")
+
+        self.ticks = sum(count for _, count in self.runs)
+
+        # Where we've got to in playback
+        self.run_index = 0
+        self.run_used = 0
+
+    def next_input(self):
+        """Returns the (held, pressed, released) masks for the next tick.
+        Once the recording has run out, there's no more input"""
+        while self.run_index < len(self.runs):
+            tick_input, count = self.runs[self.run_index]
+            if self.run_used < count:
+                self.run_used += 1
+                return tick_input
+            self.run_index += 1
+            self.run_used = 0
+        return 0, 0, 0
+
+    def verify(self, tick, checksum):
+        """Checks the game's checksum after the given tick against the
+        recording, raising ReplayDivergenceError if they differ"""
+        expected = self.checksums.get(tick)
+        if expected is not None and expected != checksum & 0xFFFFFFFF:
+            raise ReplayDivergenceError(
+                f"Replay diverged at tick {tick}: expected checksum "
+                f"{expected:08x}, got {checksum & 0xFFFFFFFF:08x}")
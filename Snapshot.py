@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+
+# Snapshot.py
+# Support for capturing the complete simulation state of the game as a
+# compact block of bytes, and putting it back again.  States and actors list
+# the attributes which make up their state in snapshot_attributes, along
+# with a struct format code for each, and these are packed one after the
+# other with a struct built once per class.  The ActorManager adds its
+# arrays as raw bytes.
+#
+# SnapshotRing keeps the snapshots of the last few ticks, for rolling back
+# and rewinding.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import struct
+
+
+# The struct for each class's snapshot_attributes, built on first use
+_structs = {}
+
+
+def attribute_struct(cls):
+    """Returns the struct.Struct which packs the snapshot_attributes of the
+    given class"""
+    packer = _structs.get(cls)
+    if packer is None:
+        packer = _structs[cls] = struct.Struct(
+            "<" + "".join(code for _, code in cls.snapshot_attributes))
+    return packer
+
+
+def pack_attributes(obj):
+    """Returns the object's snapshot_attributes packed into bytes"""
+    return attribute_struct(type(obj)).pack(
+        *[getattr(obj, name) for name, _ in obj.snapshot_attributes])
+
+
+def unpack_attributes(obj, data, offset=0):
+    """Sets the object's snapshot_attributes from bytes packed by
+    pack_attributes(), starting at the given offset.  Returns the offset of
+    the first byte after them"""
+    packer = attribute_struct(type(obj))
+    for (name, _), value in zip(obj.snapshot_attributes,
+                                packer.unpack_from(data, offset)):
+        setattr(obj, name, value)
+    return offset + packer.size
+
+
+class SnapshotRing:
+    def __init__(self, capacity=120):
+        """A fixed number of snapshots, keyed by the tick they were taken
+        after.  Once it's full, each new snapshot replaces the oldest"""
+        self.capacity = capacity
+        self.ticks = [None] * capacity
+        self.snapshots = [None] * capacity
+
+    def push(self, tick, snapshot):
+        """Stores the snapshot taken after the given tick"""
+        index = tick % self.capacity
+        self.ticks[index] = tick
+        self.snapshots[index] = snapshot
+
+    def get(self, tick):
+        """Returns the snapshot taken after the given tick, or None if we
+        don't have it (any more)"""
+        index = tick % self.capacity
+        if self.ticks[index] != tick:
+            return None
+        return self.snapshots[index]
+
+    def discard_after(self, tick):
+        """Forgets any snapshots taken after the given tick.  Used after
+        rolling back, since they're of a future that didn't happen"""
+        for index, held in enumerate(self.ticks):
+            if held is not None and held > tick:
+                self.ticks[index] = self.snapshots[index] = None
+
+    def clear(self):
+        """Forgets every snapshot"""
+        self.ticks = [None] * self.capacity
+        self.snapshots = [None] * self.capacity
@@ -9,14 +9,22 @@
 # Version: 0.01  -  Initial version
 #
 import pygame
+from Graphics import merge_rects, subtract_rect
+from Layer import Layer
+from Snapshot import pack_attributes, unpack_attributes
 
 
 # A generic state to be managed via the StateManager object.  Note that all
 # methods expect the first passed parameter to be a reference to the actual
 # game object itself.  This allows for access to any global elements stored
-# within the main game object itself (e.g. the game.is_running flag
-# referenced in the handle_events() method
+# within the main game object itself (e.g. the game.input manager which the
+# states read the player's input from in their update() methods)
 class State:
+    # The attributes which make up the state's simulation state, with their
+    # struct format codes, for snapshot() and restore().  Only things which
+    # update() changes (and which affect how the game plays out) belong here
+    snapshot_attributes = ()
+
     def __init__(self, game):
         """Perform any on-load initialisation of the state.  e.g. preload
         resources, set persistent buffer lengths, etc. """
@@ -32,45 +40,253 @@ class State:
 
         # Assign an instance placeholder for the drawing canvas for this state
         # We'll actually allocate this during the startup call and deallocate
-        # when we exit
+        # when we exit.  The canvas is game.render_resolution pixels, but
+        # display_width and display_height are in the game's coordinates,
+        # like everything else the states lay out
         self.display_surface = None
         self.display_width = None
         self.display_height = None
 
+        # States which redraw everything they touch every frame don't need a
+        # canvas of their own and can set this to draw straight to the window
+        self.render_to_window = False
+
+        # How often the state needs drawing.  None means every frame; a
+        # number of frames per second lets the main loop slow down for a
+        # state with only gentle animation; and 0 means the state only ever
+        # changes in response to input, so the loop can sleep until some
+        # arrives.  Either way, input wakes the loop straight away
+        self.animation_rate = None
+
+        # The areas of the window which have changed since the last frame was
+        # presented.  States add to this with mark_dirty() as they draw
+        self.dirty_rects = []
+
+        # The layers composed by compose(), bottom first, keyed by name.  Set
+        # recompose to have the whole canvas composed again from scratch
+        self.layers = {}
+        self.recompose = True
+
     def handle_events(self):
-        """Run the 'event pump' and handle any events that arise.  This base
-        class provides a simple event pump that merely checks the presence of
-        the pressing of the space bar and raises the pygame.QUIT event.
-        Processing of the pygame.QUIT event causes the game itself to
-        terminate"""
-        # Run event pump
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    pygame.event.post(pygame.event.Event(pygame.QUIT))
-            if event.type == pygame.QUIT:
-                self.game.is_running = False
-        # End event pump
+        """Called once per frame after the game's input manager has pumped
+        the event queue.  States should normally read the player's input
+        from self.game.input in their update() method instead, so this base
+        class does nothing"""
+        pass
 
     def update(self, game_time, dt):
         """Update the simulation"""
         pass
 
-    def display(self):
-        """Draw the current frame"""
+    def capture(self):
+        """Returns an immutable copy of whatever display() needs from the
+        simulation.  When the simulation runs on its own thread, this is
+        taken after every tick and handed to display(), so that drawing
+        never sees a tick half done.  States whose display doesn't depend on
+        update() can leave this returning None"""
+        return None
+
+    def display(self, alpha=0.0, frame=None):
+        """Draw the current frame.  Alpha is the fraction of a timestep (0 to
+        1) that has passed since the last update, for interpolating motion.
+        Frame is what capture() returned after the latest tick, or None to
+        capture the state as it is now"""
         pass
 
+    def checksum(self):
+        """Returns an integer summarising the state's simulation state, used
+        to check that a replayed game hasn't diverged from the recording.
+        Anything which affects how the game plays out should feed into it"""
+        return 0
+
+    def snapshot(self):
+        """Returns the state's simulation state as bytes, which restore()
+        can put back later.  By default this is the snapshot_attributes"""
+        return pack_attributes(self)
+
+    def restore(self, data):
+        """Puts back the simulation state from bytes returned by snapshot().
+        The state must be current"""
+        unpack_attributes(self, data)
+        self.mark_dirty()
+
+    def add_layer(self, name, draw, static=True, opaque=False, size=None):
+        """Adds a layer on top of the existing ones.  Static layers are
+        always composed beneath the dynamic ones.  See Layer for the
+        parameters; size is in the game's coordinates"""
+        if size is not None:
+            size = self.game.scale_size(size)
+        layer = Layer(name, draw, static, opaque, size)
+        self.layers[name] = layer
+        return layer
+
+    def invalidate_layer(self, name, rect=None):
+        """Has a static layer drawn again (just within rect, in the game's
+        coordinates relative to the layer, if given) the next time we
+        compose"""
+        layer = self.layers[name]
+        if layer.surface is not None:
+            layer.invalid.append(layer.surface.get_rect() if rect is None
+                                 else self.game.scale_rect(rect))
+
+    def move_layer(self, name, offset):
+        """Moves a static layer to a new position in the frame, given in
+        the game's coordinates"""
+        scale = self.game.render_scale
+        self.layers[name].offset = (int(offset[0] * scale),
+                                    int(offset[1] * scale))
+
+    def compose(self, frame=None, alpha=0.0):
+        """Composes the layers onto the drawing canvas and marks what's
+        changed as dirty.  Only the parts of the canvas which have changed
+        are touched: where static layers have been invalidated or moved, and
+        where the dynamic layers were drawn last frame, are rebuilt from the
+        static layers' surfaces, then the dynamic layers are drawn on top.
+        Frame and alpha are passed on to the dynamic layers"""
+        surface = self.display_surface
+        canvas = surface.get_rect()
+        static = [layer for layer in self.layers.values() if layer.static]
+        dynamic = [layer for layer in self.layers.values()
+                   if not layer.static]
+
+        damage = []
+        if self.recompose:
+            damage.append(canvas)
+            self.recompose = False
+
+        for layer in static:
+            if layer.surface is None:
+                layer.surface = self.game.render_targets.acquire(
+                    layer.size or canvas.size, alpha=not layer.opaque)
+                layer.invalid = [layer.surface.get_rect()]
+
+            # Draw any invalid parts of the layer again
+            for rect in merge_rects(layer.invalid):
+                layer.surface.set_clip(rect)
+                if not layer.opaque:
+                    layer.surface.fill((0, 0, 0, 0), rect)
+                layer.draw(layer.surface)
+                damage.append(rect.move(layer.offset))
+            layer.surface.set_clip(None)
+            layer.invalid = []
+
+            if layer.offset != layer.drawn_offset:
+                if layer.drawn_offset is not None:
+                    damage.append(layer.drawn_rect)
+                damage.append(layer.rect)
+                layer.drawn_offset = layer.offset
+
+        # Rub out the dynamic layers as they were last frame
+        for layer in dynamic:
+            damage.extend(layer.drawn_rects)
+
+        damage = [rect.clip(canvas) for rect in merge_rects(damage)]
+        for rect in damage:
+            if rect:
+                self._compose_static(surface, rect, static, len(static))
+
+        for layer in dynamic:
+            layer.drawn_rects = layer.draw(surface, frame, alpha)
+            damage.extend(layer.drawn_rects)
+
+        for rect in damage:
+            self.mark_dirty(rect)
+
+    def mark_dirty(self, rect=None):
+        """Records that an area of the window (in pixels) has changed and
+        needs to be presented.  If no rect is given, then the whole window is
+        marked"""
+        if rect is None:
+            rect = pygame.Rect((0, 0), self.game.render_resolution)
+        self.dirty_rects.append(pygame.Rect(rect))
+
+    def collect_dirty_rects(self):
+        """Returns the list of areas marked dirty since the last call, and
+        starts a new, empty list"""
+        rects = self.dirty_rects
+        self.dirty_rects = []
+        return rects
+
+    def blit_to_window(self):
+        """Copies the dirty areas of the state's drawing canvas onto the game
+        window, leaving the rest of the window untouched"""
+        if self.display_surface is self.game.display_window:
+            return
+
+        for rect in self.dirty_rects:
+            self.game.display_window.blit(self.display_surface, rect, rect)
+
     def startup(self):
         """Perform any state specific initialisation each time the state
         becomes current (e.g. resetting scores, setting player positions,
         etc."""
         # Define the drawing surface for the state so we can render output
-        self.display_surface = pygame.Surface(self.game.resolution)
-        self.display_width = self.display_surface.get_width()
-        self.display_height = self.display_surface.get_height()
+        if self.render_to_window:
+            self.display_surface = self.game.display_window
+        else:
+            self.display_surface = self.game.render_targets.acquire(
+                self.game.render_resolution)
+        self.display_width = self.game.width
+        self.display_height = self.game.height
+
+        # Nothing we draw is on the window yet, so the first frame needs to
+        # compose and present everything
+        self.dirty_rects = []
+        self.mark_dirty()
+        self.recompose = True
+
+    def resume(self):
+        """Called when the state becomes current again after the state above
+        it has been popped.  That state drew over the whole window, so
+        everything needs presenting again, and if we draw straight onto the
+        window, composing again too"""
+        if self.render_to_window:
+            self.recompose = True
+        self.mark_dirty()
+
+    def release_resources(self):
+        """Release any expensive resources (e.g. pre-rendered surfaces) which
+        the state keeps between being popped and pushed again.  Called by the
+        StateManager when it needs to claw back memory.  By default, this
+        drops the static layers' surfaces.  They aren't handed back to the
+        render target pool, since the point is to free the memory"""
+        for layer in self.layers.values():
+            layer.surface = None
+            layer.drawn_offset = None
+        self.recompose = True
+
+    def resident_bytes(self):
+        """Returns the number of bytes held by the resources which would be
+        freed by release_resources()"""
+        return sum(layer.surface.get_pitch() * layer.surface.get_height()
+                   for layer in self.layers.values()
+                   if layer.surface is not None)
+
+    def _compose_static(self, surface, rect, layers, count):
+        """Private method to rebuild an area of the canvas from the bottom
+        count static layers.  Where an opaque layer covers the area, the
+        layers beneath it aren't drawn at all"""
+        if count == 0:
+            surface.fill(self.black, rect)
+            return
+
+        layer = layers[count - 1]
+        covered = rect.clip(layer.rect)
+        if layer.opaque and covered:
+            for piece in subtract_rect(rect, covered):
+                self._compose_static(surface, piece, layers, count - 1)
+        else:
+            self._compose_static(surface, rect, layers, count - 1)
+
+        if covered:
+            surface.blit(layer.surface, covered,
+                         covered.move(-layer.offset[0], -layer.offset[1]))
 
     def cleanup(self):
         """Perform any cleanup of resources once the state is no longer
         current (e.g. clearing buffers, deallocating resources, etc."""
-        # Destroy the drawing surface for the state to free memory when GC runs
+        # Hand the drawing surface back to the pool so another state can use it
+        if self.display_surface is not None and \
+                self.display_surface is not self.game.display_window:
+            self.game.render_targets.release(self.display_surface)
         self.display_surface = None
@@ -10,8 +10,11 @@
 # Date:    20/06/2021
 # Version: 0.01  -  Initial version
 #
+from collections import OrderedDict
 import importlib
 import sys
+import threading
+import time
 
 
 class StateManager:
@@ -31,57 +34,185 @@ class StateManager:
         self.current_state = None
 
         # Load the states and bootstrap the state manager
-        # States is stored as a dictionary so we can refer to states by name
+        # States is stored as a dictionary so we can refer to states by name.
+        # The states are only imported and constructed the first time they
+        # are pushed (or when prewarm() gets to them), so state_defs holds the
+        # definitions of all the states we know about until then
         self.states = {}
+        self.state_defs = {}
+        self._state_lock = threading.RLock()
+
+        # Anything raised while prewarming a state, keyed on the state's
+        # name, to be raised again when that state is asked for
+        self.prewarm_errors = {}
+
+        # States which have been popped keep their expensive resources, so
+        # that they're quick to come back to, until the resources held by
+        # all the states go over warm_budget bytes.  Then the popped states
+        # are made to release them, least recently used first.  Spare
+        # surfaces in the render target pool count towards the budget too
+        self.warm_budget = 16 * 1024 * 1024
+        self.warm_states = OrderedDict()
+
+        # Held while the stack changes.  When the simulation runs on its own
+        # thread, the main loop holds it while drawing so that the state
+        # being drawn can't be cleaned up underneath it
+        self.transition_lock = threading.RLock()
+
         self._load_states(states)
 
     def push(self, state):
         """Adds the specified state to the end of the state_stack list and
         updates the current_state instance variable.  Also causes the new
         state to perform any required setup tasks before it kicks in"""
-        self.state_stack.append(self.states[state])
-        self.current_state = self.state_stack[-1]
-        self.current_state.startup()
+        new_state = self._get_state(state)
+        with self.transition_lock:
+            self.state_stack.append(new_state)
+            self.current_state = new_state
+            self.warm_states.pop(state, None)
+            self.current_state.startup()
+            self._enforce_warm_budget()
+
+    def get(self, state):
+        """Returns the named state, loading it first if need be"""
+        return self._get_state(state)
 
     def pop(self):
         """Removes the currently executing state from the stack and, if there
         are any remaining states, updates the current_state instance variable
         to point back to it.  If there are no remaining states, then exits
         the game"""
-        # Perform any necessary cleanup functionality before terminating the
-        # state
-        self.current_state.cleanup()
-        self.state_stack.pop()
+        with self.transition_lock:
+            # Perform any necessary cleanup functionality before terminating
+            # the state
+            popped = self.state_stack.pop()
+            popped.cleanup()
+
+            # Keep the state warm, unless it's still further down the stack
+            if popped not in self.state_stack:
+                name = self.name_of(popped)
+                self.warm_states[name] = popped
+                self.warm_states.move_to_end(name)
+                self._enforce_warm_budget()
+
+            # Terminate the game if we've popped the last item from the
+            # stack...
+            if len(self.state_stack) == 0:
+                self.game.is_running = False
+            else:
+                self.current_state = self.state_stack[-1]
+
+                # The popped state drew over the whole window, so the state
+                # we've returned to needs to present everything again
+                self.current_state.resume()
+
+    def resident_bytes(self):
+        """Returns a dictionary of the number of bytes of resources held by
+        each loaded state"""
+        with self._state_lock:
+            states = list(self.states.items())
+        return {name: state.resident_bytes() for name, state in states}
+
+    def set_warm_budget(self, budget):
+        """Changes the memory budget for warm states, releasing resources
+        straight away if we're now over it"""
+        self.warm_budget = budget
+        self._enforce_warm_budget()
+
+    def _enforce_warm_budget(self):
+        """Private method which makes the least recently used popped states
+        release their resources until the total held is within budget, then
+        trims the render target pool to whatever's left of the budget"""
+        total = sum(self.resident_bytes().values())
+        while total > self.warm_budget and self.warm_states:
+            _, state = self.warm_states.popitem(last=False)
+            total -= state.resident_bytes()
+            state.release_resources()
+        self.game.render_targets.trim(max(0, self.warm_budget - total))
+
+    def name_of(self, state):
+        """Returns the name a state was registered under"""
+        with self._state_lock:
+            states = list(self.states.items())
+        for name, this_state in states:
+            if this_state is state:
+                return name
 
-        # Terminate the game if we've popped the last item from the stack...
-        if len(self.state_stack) == 0:
-            self.game.is_running = False
-        else:
-            self.current_state = self.state_stack[-1]
+    def prewarm(self, states=None):
+        """Imports and constructs states in a background thread so that they
+        are ready before they are first pushed.  If no list of state names is
+        given, then every state which hasn't been loaded yet is prewarmed.
+        Returns the thread doing the work"""
+        if states is None:
+            states = [name for name in self.state_defs
+                      if name not in self.states]
+
+        def warm():
+            for name in states:
+                try:
+                    self._get_state(name)
+                except BaseException as e:
+                    # Including sys.exit() from _construct_state(), which
+                    # would otherwise only end this thread
+                    self.prewarm_errors[name] = e
+
+        thread = threading.Thread(target=warm, name="StatePrewarm",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def _get_state(self, name):
+        """Private method which returns the named state, importing its module
+        and constructing it first if this is the first time it's needed.  If
+        prewarming the state failed, then whatever it raised is raised
+        here"""
+        with self._state_lock:
+            error = self.prewarm_errors.pop(name, None)
+            if error is not None:
+                raise error
+            state = self.states.get(name)
+            if state is None:
+                state = self._construct_state(self.state_defs[name])
+                self.states[name] = state
+            return state
+
+    def _construct_state(self, this_state):
+        """Private method used to load a state from its module and create
+        the state object, logging how long each step takes"""
+        try:
+            # Do the import
+            started = time.perf_counter()
+            module = importlib.import_module(this_state['file'])
+            self.game.log_timing(f"import {this_state['file']}",
+                                 time.perf_counter() - started)
+
+            class_ = getattr(module, this_state['name'])
+        except ModuleNotFoundError:
+            # Raise an exception on error
+            print(f"The module "
+                  f"{this_state['file']}.py could not be loaded.  Aborting.")
+            sys.exit(ModuleNotFoundError)
+        except AttributeError:
+            # Raise an exception on error
+            print(f"The class {this_state['name']} could not be found in "
+                  f"module {this_state['file']}.py.  Aborting.")
+            sys.exit(AttributeError)
+
+        started = time.perf_counter()
+        state = class_(self.game)
+        self.game.log_timing(f"construct {this_state['name']}",
+                             time.perf_counter() - started)
+        return state
 
     def _load_states(self, states):
-        """Private method used to load the state matrix into the StateManager
-        object from their individual modules"""
+        """Private method used to register the state matrix with the
+        StateManager.  Only the default state is loaded straight away"""
+        # Make sure Python can see any state modules written since startup
+        importlib.invalidate_caches()
+
         for this_state in states:
-            try:
-                # Do the import
-                module = importlib.import_module(this_state['file'])
-                class_ = getattr(module, this_state['name'])
-                self.states[this_state['name']] = class_(self.game)
-            except ModuleNotFoundError:
-                # Raise an exception on error
-                print(f"The module "
-                      f"{this_state['file']}.py could not be loaded.  Aborting.")
-                sys.exit(ModuleNotFoundError)
-            except AttributeError:
-                # Raise an exception on error
-                print(f"The class {this_state['name']} could not be found in "
-                      f"module {this_state['file'].py}.  Aborting.")
-                sys.exit(AttributeError)
+            self.state_defs[this_state['name']] = this_state
 
+        for this_state in states:
             if this_state['default'] is True:
                 self.push(this_state['name'])
-
-        # Now that we've imported all the states, invalidate the cache so
-        # that Python can recognise the new code
-        importlib.invalidate_caches()
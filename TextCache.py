@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+# TextCache.py
+# A caching layer for rendering text.  Font objects are kept for the life of
+# the program (keyed on their file and size) and rendered text surfaces are
+# kept in a least-recently-used cache bounded by a memory budget, so that
+# text which is redrawn every frame only gets rasterised once.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+from collections import OrderedDict
+import pygame
+
+
+class TextCache:
+    def __init__(self, budget=8 * 1024 * 1024):
+        """Initialises an empty cache.
+
+        Parameters
+        ----------
+        budget : int
+            The maximum number of bytes of rendered text surfaces which the
+            cache will hold before it starts evicting the least recently used
+            entries.  Font objects do not count towards the budget.
+        """
+        self.budget = budget
+        self.fonts = {}               # (file, size) -> pygame.font.Font
+        self.surfaces = OrderedDict()  # (text, file, size, colour) -> Surface
+        self.resident_bytes = 0
+
+        # Statistics so we can see how well the cache is performing
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_font(self, font, size):
+        """Returns the pygame Font object for the given font file and size,
+        loading it only the first time it is asked for"""
+        key = (font, size)
+        font_obj = self.fonts.get(key)
+        if font_obj is None:
+            font_obj = pygame.font.Font(font, size)
+            self.fonts[key] = font_obj
+        return font_obj
+
+    def render(self, text, font, size, colour):
+        """Returns an antialiased surface containing the rendered text.  The
+        returned surface is shared with the cache so must not be drawn on"""
+        key = (text, font, size, tuple(colour))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.get_font(font, size).render(text, True, colour)
+        self.surfaces[key] = surface
+        self.resident_bytes += self._surface_bytes(surface)
+        self._enforce_budget()
+        return surface
+
+    def set_budget(self, budget):
+        """Changes the memory budget, evicting entries straight away if the
+        cache is now over budget"""
+        self.budget = budget
+        self._enforce_budget()
+
+    def clear(self):
+        """Discards all cached fonts and surfaces.  The statistics are left
+        untouched"""
+        self.fonts.clear()
+        self.surfaces.clear()
+        self.resident_bytes = 0
+
+    def stats(self):
+        """Returns a dictionary of the cache statistics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.surfaces),
+            "fonts": len(self.fonts),
+            "resident_bytes": self.resident_bytes,
+            "budget": self.budget
+        }
+
+    def _enforce_budget(self):
+        """Private method to evict the least recently used surfaces until the
+        cache fits within its budget.  The most recently rendered surface is
+        always kept, even if it is larger than the budget on its own"""
+        while self.resident_bytes > self.budget and len(self.surfaces) > 1:
+            _, surface = self.surfaces.popitem(last=False)
+            self.resident_bytes -= self._surface_bytes(surface)
+            self.evictions += 1
+
+    @staticmethod
+    def _surface_bytes(surface):
+        """Private method to calculate the pixel memory used by a surface"""
+        return surface.get_pitch() * surface.get_height()
+
+
+# The cache shared by everything which draws text through Graphics.draw_text
+text_cache = TextCache()
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+
+# TripleBuffer.py
+# Hands values from one thread to another without either having to wait for
+# the other.  The writer always has a buffer of its own to write into, and
+# the reader always has one of its own to read from; the third holds the
+# newest value published, and publishing or picking it up just swaps it with
+# the writer's or reader's buffer.  The reader always gets the newest value,
+# and any the writer publishes in the meantime are simply dropped.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import threading
+
+
+class TripleBuffer:
+    def __init__(self, initial=None):
+        """Sets up the buffers, all holding the initial value"""
+        self.buffers = [initial, initial, initial]
+        self.back = 0       # The writer's buffer
+        self.middle = 1     # The newest published value
+        self.front = 2      # The reader's buffer
+        self.fresh = False  # Whether the middle buffer hasn't been read yet
+        self.lock = threading.Lock()
+
+    def publish(self, value):
+        """Makes value the newest for the reader.  Only call from the
+        writing thread"""
+        self.buffers[self.back] = value
+        with self.lock:
+            self.back, self.middle = self.middle, self.back
+            self.fresh = True
+
+    def read(self):
+        """Returns the newest value published.  Only call from the reading
+        thread"""
+        with self.lock:
+            if self.fresh:
+                self.front, self.middle = self.middle, self.front
+                self.fresh = False
+        return self.buffers[self.front]
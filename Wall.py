@@ -0,0 +1,19 @@
+#!/usr/bin/python3
+
+# Wall.py
+# A solid, immovable block, such as the walls along the top and bottom of
+# the playfield.  Walls aren't drawn (they're part of the playfield image);
+# they're only there for other actors to run into.
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+from Actor import Actor
+
+
+class Wall(Actor):
+    __slots__ = ()
+
+    def create(self):
+        """Code that executes when an instance of the object is created"""
+        self.solid = True
@@ -0,0 +1,248 @@
+#!/usr/bin/python3
+
+# benchmark.py
+# A set of performance benchmarks for the game, run headless under SDL's
+# dummy video driver.  Results are saved as JSON, and can be compared against
+# a stored baseline; the compare command exits with a non-zero status if any
+# benchmark has got slower by more than the threshold, so it can be used as a
+# regression gate.
+#
+#   python benchmark.py run --output results.json
+#   python benchmark.py compare baseline.json results.json --threshold 0.1
+#
+# Date:    18/10/2026
+# Version: 0.01  -  Initial version
+#
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+# Must be set before pygame is imported anywhere
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+import pong
+from Actor import Actor
+from ActorManager import ActorManager
+from Graphics import draw_text
+from TextCache import text_cache
+
+STATES = [
+    {"name": "MainMenu", "file": "MainMenuState", "default": True},
+    {"name": "Credits", "file": "CreditsState", "default": False},
+    {"name": "MainGame", "file": "MainGameState", "default": False},
+]
+
+ACTOR_COUNTS = (10, 1000, 10000)
+
+
+class BenchActor(Actor):
+    __slots__ = ()
+
+
+def time_it(func, number, repeat):
+    """Calls func number times, repeat times over, and returns the median
+    time per call in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def bench_draw_text(game, repeat):
+    """Draws the main menu's strings, as the menu does every frame"""
+    surface = game.render_targets.acquire(game.render_resolution)
+    font = pygame.font.get_default_font()
+    entries = ["PONG", "One Player", "Two Player", "Credits", "Quit"]
+
+    def draw():
+        for text in entries:
+            draw_text(surface, text, font, 20, 512, 384, (255, 255, 255),
+                      scale=game.render_scale)
+
+    result = time_it(draw, 200, repeat) / len(entries)
+    game.render_targets.release(surface)
+    return {"draw_text": result}
+
+
+def bench_display(game, repeat):
+    """Times a full frame for each state.  The game is advanced a tick
+    before each frame, so that there's something new to draw (the credits
+    scroll, the menu pulses and the ball moves), which means the timings
+    include one tick of update as well as display and present"""
+    results = {}
+    manager = game.state_manager
+    for name in ("MainMenu", "Credits", "MainGame"):
+        if name != "MainMenu":
+            manager.push(name)
+
+        # Get past the pause before the first serve, so the ball is moving
+        for _ in range(round(1.5 / game.dt)):
+            game.step()
+
+        def frame():
+            game.step()
+            manager.current_state.display()
+            game.present()
+
+        results[f"display_{name}"] = time_it(frame, 100, repeat)
+
+        if name != "MainMenu":
+            manager.pop()
+    return results
+
+
+def drop_caches(game):
+    """Empties the render target pool and the asset and text caches, so the
+    next state to start up has to allocate, load and render everything"""
+    game.render_targets.clear()
+    budget = game.assets.budget
+    game.assets.set_budget(0)
+    game.assets.set_budget(budget)
+    text_cache.clear()
+
+
+def bench_push_pop(game, repeat):
+    """Times pushing a state, drawing its first frame and popping it, both
+    warm (resources kept from last time) and cold (resources released and
+    every cache emptied between pushes)"""
+    manager = game.state_manager
+    results = {}
+    for name in ("Credits", "MainGame"):
+        def warm():
+            manager.push(name)
+            manager.current_state.display()
+            game.present()
+            manager.pop()
+
+        def cold():
+            warm()
+            manager.states[name].release_resources()
+            drop_caches(game)
+
+        results[f"push_pop_warm_{name}"] = time_it(warm, 50, repeat)
+        results[f"push_pop_cold_{name}"] = time_it(cold, 10, repeat)
+    return results
+
+
+def bench_startup(repeat):
+    """Times a fresh process starting the game and drawing its first
+    frame"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, "pong.py"), "--headless",
+               "--ticks", "1", "--render-every", "1"]
+
+    def start():
+        subprocess.run(command, cwd=here, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return {"startup": time_it(start, 1, repeat)}
+
+
+def bench_actors(game, repeat):
+    """Times a tick of movement, and a collision pass, for increasing
+    numbers of actors kept at a constant density"""
+    results = {}
+    for count in ACTOR_COUNTS:
+        manager = ActorManager(game)
+        manager.load_objects({"actor": BenchActor})
+        rng = random.Random(count)
+        side = (count * 400) ** 0.5   # One actor per 20x20 pixels
+        for _ in range(count):
+            actor = manager.create_instance("actor")
+            actor.x, actor.y = rng.uniform(0, side), rng.uniform(0, side)
+            actor.width = actor.height = 8
+            actor.direction = rng.uniform(0, 360)
+            actor.speed = 100
+
+        # Time the movement on its own first, while nothing is solid so the
+        # update doesn't include a collision pass
+        number = max(1, 10000 // count)
+        results[f"actors_update_{count}"] = time_it(
+            lambda: manager.update(game.dt), number, repeat)
+
+        manager.solid[:manager.slots_used] = True
+        results[f"actors_collide_{count}"] = time_it(
+            manager.collide, number, repeat)
+    return results
+
+
+def run(args):
+    """Runs all the benchmarks and saves the results"""
+    game = pong.Game(STATES, headless=True)
+    game.pacer.set_target_fps(0)
+
+    results = {}
+    results.update(bench_draw_text(game, args.repeat))
+    results.update(bench_display(game, args.repeat))
+    results.update(bench_push_pop(game, args.repeat))
+    results.update(bench_actors(game, args.repeat))
+    results.update(bench_startup(args.repeat))
+
+    for name, seconds in results.items():
+        print(f"{name:32s} {seconds * 1e6:12.2f} us")
+
+    with open(args.output, "w") as results_file:
+        json.dump({"python": platform.python_version(),
+                   "pygame": pygame.version.ver,
+                   "machine": platform.machine(),
+                   "results": results}, results_file, indent=2)
+    return 0
+
+
+def compare(args):
+    """Compares two sets of results.  Returns 1 if anything has regressed
+    by more than the threshold"""
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    with open(args.current) as current_file:
+        current = json.load(current_file)["results"]
+
+    regressed = False
+    for name in sorted(baseline):
+        if name not in current:
+            print(f"{name:32s} missing from current results  REGRESSION")
+            regressed = True
+            continue
+
+        ratio = current[name] / baseline[name] if baseline[name] else 1.0
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{name:32s} {baseline[name] * 1e6:12.2f} us "
+              f"{current[name] * 1e6:12.2f} us {ratio:6.2f}x{flag}")
+
+    return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pong benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", default="benchmark.json",
+                            help="file to save the results to")
+    run_parser.add_argument("--repeat", type=int, default=5,
+                            help="number of times to repeat each benchmark")
+
+    compare_parser = commands.add_parser(
+        "compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="fractional slowdown allowed before a "
+                                     "benchmark counts as a regression")
+
+    args = parser.parse_args()
+    sys.exit(run(args) if args.command == "run" else compare(args))
@@ -8,80 +8,775 @@
 # Version: 0.01  -  Initial version
 #
 
+import argparse
+import logging
+import math
+import os
+import random
+import struct
+import sys
+import threading
 import time
+import zlib
 import pygame
 import StateManager
+from Graphics import merge_rects
+from FramePacer import FramePacer
+from RenderTargetPool import RenderTargetPool
+from AssetManager import AssetManager
+from InputManager import InputManager
+from Profiler import FrameProfiler, RateMeter, CpuMeter
+from Replay import ReplayRecorder, ReplayPlayer
+from Snapshot import SnapshotRing
+from TripleBuffer import TripleBuffer
+from Network import LossyLink
+from NetPlay import NetHost, NetClient
+
+logger = logging.getLogger(__name__)
+
+# The start of a game snapshot: magic, version, tick count, game time and
+# the name of the current state.  The random number generator's state
+# follows, then the current state's own snapshot
+SNAPSHOT_MAGIC = b"PONGSNAP"
+SNAPSHOT_HEADER = struct.Struct("<8sHQd16s")
+SNAPSHOT_RNG = struct.Struct("<625I?d")     # Mersenne Twister state, and
+                                            # the gaussian spare if any
+SNAPSHOT_VERSION = 2
 
 
 class Game:
     """The main object used in the game"""
 
-    def __init__(self, state_defs):
-        """Perform the basic initialisation and set up the screen"""
-        pygame.init()
+    def __init__(self, state_defs, headless=False, seed=None,
+                 render_resolution=None, window_scale=None):
+        """Perform the basic initialisation and set up the screen.  If
+        headless is True, then SDL's dummy drivers are used so that no window
+        is ever opened, which lets the game be driven by simulate() on
+        machines without a display (e.g. soak tests and CI runs).  Seed is
+        used for the game's random number generator; if it isn't given then
+        a random seed is picked.
+
+        Render_resolution is the size, in pixels, that frames are drawn at.
+        It must be the same shape as the game's resolution, and defaults to
+        it.  Each frame is scaled up by window_scale (a whole number) to fit
+        the window; if that isn't given, then SDL picks the largest whole
+        number scale which fits the desktop"""
+        self.headless = headless
+        if self.headless:
+            # These have to be set before pygame initialises the display
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
 
-        # Define the screen dimensions and initialise the display
+        # Keep a note of how long each part of startup takes so that we can
+        # keep an eye on the time to the first frame
+        self.startup_began = time.perf_counter()
+        self.startup_timings = []
+        self.first_frame_logged = False
+
+        # Define the screen dimensions.  The states work in these
+        # coordinates whatever size the frames are actually drawn at, and
+        # scale_rect() and Graphics.draw_text() (given render_scale) map them
+        # onto the frame
         self.resolution = (self.width, self.height) = (1024, 768)
+        self.render_resolution = tuple(render_resolution or self.resolution)
+        self.render_scale = self.render_resolution[0] / self.width
+        if self.render_resolution[0] < 1 or \
+                self.render_resolution[1] != round(self.height
+                                                   * self.render_scale):
+            raise ValueError(f"a render resolution of "
+                             f"{self.render_resolution[0]}x"
+                             f"{self.render_resolution[1]} isn't the same "
+                             f"shape as {self.width}x{self.height}")
+        if window_scale is not None and window_scale < 1:
+            raise ValueError("the window scale must be at least 1")
+
+        # Only start the pygame subsystems we actually use.  pygame.init()
+        # would also start the mixer, joystick, etc. which all take time
+        started = time.perf_counter()
+        pygame.display.init()
+        pygame.font.init()
+        self.log_timing("pygame init", time.perf_counter() - started)
+
         #display_flags = pygame.FULLSCREEN | pygame.SCALED
-        display_flags = pygame.SCALED
+        # Frames are drawn onto display_window.  With SCALED, SDL scales
+        # the window up for us on the graphics card.  The dummy driver has
+        # no renderer, so can't provide a SCALED window, and if we've been
+        # given a scale we do it ourselves in present(), from an off-screen
+        # frame onto the window
+        started = time.perf_counter()
+        self.window_scale = window_scale
+        if window_scale is None:
+            self.window = pygame.display.set_mode(
+                self.render_resolution,
+                0 if self.headless else pygame.SCALED)
+        else:
+            self.window = pygame.display.set_mode(
+                (self.render_resolution[0] * window_scale,
+                 self.render_resolution[1] * window_scale))
+        if window_scale is None or window_scale == 1:
+            self.display_window = self.window
+        else:
+            self.display_window = pygame.Surface(
+                self.render_resolution).convert()
+        self.log_timing("display creation", time.perf_counter() - started)
 
-        #  Probably don't need this in the game object
-        #  itself.
-        #  self.display_surface = pygame.Surface(self.resolution)
-        self.display_window = pygame.display.set_mode(
-            self.resolution,
-            display_flags)
+        # Off-screen drawing surfaces are shared between the states, rather
+        # than each state allocating its own every time it starts up
+        self.render_targets = RenderTargetPool()
+
+        # Images (and other assets) are loaded once and shared via here
+        self.assets = AssetManager()
+
+        # All the player's input is gathered here, once per frame
+        self.input = InputManager()
+        self.input.filter_events()
+
+        # Opt-in timing of each part of the frame (see run())
+        self.profiler = FrameProfiler()
 
         # Perform any global game specific setup here
         self.frames_per_second = 60
         self.dt = 1/self.frames_per_second
+
+        # Limit how often we draw, and how many simulation ticks we'll run
+        # in a single frame to catch up after a stall.  Without the latter, a
+        # long stall means a huge burst of updates, which makes the next
+        # frame late too, and so on (the 'spiral of death')
+        self.pacer = FramePacer(target_fps=self.frames_per_second)
+        self.max_ticks_per_frame = 5
+
+        # If more than this fraction of the window has changed, it's cheaper
+        # to flip the whole thing than to update lots of separate areas
+        self.full_flip_threshold = 0.5
+        self.pixels_presented = 0   # Number of pixels sent in the last frame
+
+        # How many simulation ticks and frames we're managing per second
+        self.tick_rate = RateMeter()
+        self.frame_rate = RateMeter()
+        self.cpu_usage = CpuMeter()
+
+        # While the current state is idle (see State.animation_rate), the
+        # longest we'll sleep waiting for input before looking again, so
+        # that anything it does on a timer still happens
+        self.idle_timeout = 0.25
+
+        # Used by run_threaded() to pass the latest tick's frame from the
+        # simulation thread to the main thread
+        self.frames = None
+        self.simulation_error = None
+
+        self.game_time = 0.0    # Simulation clock, advanced by dt every tick
+        self.tick_count = 0     # Number of ticks run so far
+
+        # All game logic must take its random numbers from here (never the
+        # random module directly) so that a game can be replayed exactly
+        self.seed = random.randrange(2 ** 63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+
+        # Set to a ReplayRecorder or ReplayPlayer to record the input to
+        # every tick, or to play it back from a recording
+        self.recorder = None
+        self.replayer = None
+
+        # Set to a SnapshotRing to keep a snapshot of every tick, so we can
+        # roll back or rewind (see keep_history())
+        self.history = None
         self.is_running = True  # This is the terminator for the main loop
 
         # Define and initialise the state manager (do this last so we have
         # the game class otherwise all set up
         self.state_manager = StateManager.StateManager(state_defs, self)
+
+        # Pull in the states we haven't needed yet while the player is
+        # looking at the first one
+        self.state_manager.prewarm()
     # End method __init__
 
+    def log_timing(self, label, seconds):
+        """Records how long part of the startup took"""
+        self.startup_timings.append((label, seconds))
+        logger.info("%s: %.1fms", label, seconds * 1000)
+
+    def _log_first_frame(self):
+        """Private method to log the time taken to get the first frame on the
+        screen, along with the breakdown of where the time went"""
+        self.first_frame_logged = True
+        total = time.perf_counter() - self.startup_began
+        logger.info("Time to first frame: %.1fms", total * 1000)
+        for label, seconds in self.startup_timings:
+            logger.info("  %-30s %7.1fms", label, seconds * 1000)
+
+    def handle_input(self):
+        """Runs the event pump and lets the current state know.  Called once
+        per frame, rather than once per simulation tick"""
+        self.input.pump()
+        if self.input.quit_requested:
+            self.is_running = False
+
+        self.state_manager.current_state.handle_events()
+    # End method handle_input
+
+    def step(self):
+        """Advances the current state by a single fixed timestep"""
+        player = self.input
+        player.begin_tick()
+        if self.replayer is not None:
+            player.held, player.pressed, player.released = \
+                self.replayer.next_input()
+        if self.recorder is not None:
+            self.recorder.record_input(player.held, player.pressed,
+                                       player.released)
+
+        # Do update code
+        self.state_manager.current_state.update(self.game_time, self.dt)
+
+        # The update has seen any key presses, so don't act on them again
+        self.input.end_tick()
+
+        self.game_time += self.dt
+        self.tick_count += 1
+        self.tick_rate.count()
+
+        if self.history is not None:
+            self.history.push(self.tick_count, self.snapshot())
+
+        if self.recorder is not None and \
+                self.tick_count % self.recorder.checksum_interval == 0:
+            self.recorder.record_checksum(self.tick_count, self.checksum())
+        if self.replayer is not None and \
+                self.tick_count in self.replayer.checksums:
+            self.replayer.verify(self.tick_count, self.checksum())
+    # End method step
+
+    def checksum(self):
+        """Returns a checksum of the simulation state: which states are on
+        the stack and each of their own checksums"""
+        checksum = 0
+        for state in self.state_manager.state_stack:
+            checksum = zlib.crc32(type(state).__name__.encode(), checksum)
+            checksum = zlib.crc32(struct.pack("<I", state.checksum()
+                                              & 0xFFFFFFFF), checksum)
+        return checksum
+    # End method checksum
+
+    def snapshot(self):
+        """Returns the complete simulation state as bytes: the clock, the
+        random number generator and the current state, which restore() can
+        put back later"""
+        state = self.state_manager.current_state
+        name = self.state_manager.name_of(state)
+        _, internal, gauss = self.rng.getstate()
+        return b"".join((
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                 self.tick_count, self.game_time,
+                                 name.encode()),
+            SNAPSHOT_RNG.pack(*internal, gauss is not None, gauss or 0.0),
+            state.snapshot()))
+    # End method snapshot
+
+    def restore(self, snapshot):
+        """Puts back the simulation state from bytes returned by
+        snapshot().  If the snapshot is of a different state to the current
+        one, then we first pop back down to that state if it's further down
+        the stack, or push it if it isn't"""
+        magic, version, tick_count, game_time, name = \
+            SNAPSHOT_HEADER.unpack_from(snapshot)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a snapshot this version of the game can "
+                             "restore")
+
+        name = name.rstrip(b"\0").decode()
+        manager = self.state_manager
+        if manager.name_of(manager.current_state) != name:
+            if manager.get(name) in manager.state_stack:
+                while manager.name_of(manager.current_state) != name:
+                    manager.pop()
+            else:
+                manager.push(name)
+
+        rng = SNAPSHOT_RNG.unpack_from(snapshot, SNAPSHOT_HEADER.size)
+        self.rng.setstate((3, rng[:625], rng[626] if rng[625] else None))
+        self.tick_count, self.game_time = tick_count, game_time
+
+        offset = SNAPSHOT_HEADER.size + SNAPSHOT_RNG.size
+        self.state_manager.current_state.restore(
+            memoryview(snapshot)[offset:])
+    # End method restore
+
+    def keep_history(self, ticks):
+        """Starts keeping snapshots of the last given number of ticks, for
+        rewind().  0 stops keeping them"""
+        self.history = SnapshotRing(ticks) if ticks else None
+
+    def rewind(self, ticks):
+        """Winds the simulation back by the given number of ticks.  Returns
+        False (and does nothing) if we don't have a snapshot from then"""
+        if self.history is None:
+            return False
+        target = self.tick_count - ticks
+        snapshot = self.history.get(target)
+        if snapshot is None:
+            return False
+        self.restore(snapshot)
+        self.history.discard_after(target)
+        return True
+    # End method rewind
+
+    def save_game(self, filename):
+        """Writes a snapshot of the game to a file"""
+        with open(filename, "wb") as save_file:
+            save_file.write(self.snapshot())
+
+    def load_game(self, filename):
+        """Restores the game from a file written by save_game()"""
+        with open(filename, "rb") as save_file:
+            self.restore(save_file.read())
+
+    def start_recording(self, filename):
+        """Starts recording the input to every tick in a replay log"""
+        self.recorder = ReplayRecorder(filename, self.seed, self.dt)
+
+    def stop_recording(self):
+        """Finishes the replay log being recorded"""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def present(self):
+        """Sends the areas of the window that the current state has changed
+        to the screen"""
+        rects = merge_rects(
+            self.state_manager.current_state.collect_dirty_rects())
+        pixels = sum(r.width * r.height for r in rects)
+        width, height = self.render_resolution
+        full_flip = pixels >= width * height * self.full_flip_threshold
+
+        # If we're scaling the frames up ourselves, then copy the changed
+        # areas onto the window, scaled, and present those instead
+        if self.display_window is not self.window:
+            if full_flip:
+                pygame.transform.scale(self.display_window,
+                                       self.window.get_size(), self.window)
+            else:
+                frame = self.display_window.get_rect()
+                rects = [self._scale_to_window(rect.clip(frame))
+                         for rect in rects if rect.colliderect(frame)]
+
+        if full_flip:
+            pygame.display.flip()
+            self.pixels_presented = width * height
+        else:
+            if rects:
+                pygame.display.update(rects)
+            self.pixels_presented = pixels
+    # End method present
+
+    def scale_rect(self, rect):
+        """Converts a rect in the game's coordinates to the pixels of the
+        frame.  Rect may be anything with x, y, width and height, including
+        floats"""
+        scale = self.render_scale
+        x, y, width, height = rect
+        return pygame.Rect(round(x * scale), round(y * scale),
+                           round(width * scale), round(height * scale))
+
+    def scale_size(self, size):
+        """Converts a (width, height) in the game's coordinates to pixels"""
+        return (round(size[0] * self.render_scale),
+                round(size[1] * self.render_scale))
+
+    def _scale_to_window(self, rect):
+        """Private method to scale an area of the frame up onto the window.
+        Returns the area of the window it covers"""
+        scale = self.window_scale
+        target = pygame.Rect(rect.x * scale, rect.y * scale,
+                             rect.width * scale, rect.height * scale)
+        pygame.transform.scale(self.display_window.subsurface(rect),
+                               target.size, self.window.subsurface(target))
+        return target
+
+    def simulate(self, ticks, render_every=0):
+        """Runs the given number of fixed timesteps as fast as possible,
+        using the virtual game clock rather than the wall clock.  If
+        render_every is non-zero, then a frame is drawn after every
+        render_every ticks.  Returns the number of ticks actually run, which
+        will be fewer than asked for if the game stops itself part way"""
+        ticks_run = 0
+
+        while ticks_run < ticks and self.is_running:
+            # There are no frames when simulating, so check for input on
+            # every tick instead
+            self.handle_input()
+            if not self.is_running:
+                break
+
+            self.step()
+            ticks_run += 1
+
+            if render_every and ticks_run % render_every == 0 \
+                    and self.is_running:
+                self.state_manager.current_state.display()
+                self.present()
+
+                if not self.first_frame_logged:
+                    self._log_first_frame()
+
+        return ticks_run
+    # End method simulate
+
     def run(self):
         """The main game loop"""
         # First, set up the frame timers
-        t = 0.0
         current_time = time.perf_counter()
         accumulator = 0.0
 
+        # The profiler calls are all guarded, so that it costs next to
+        # nothing when it's switched off
+        prof = self.profiler
+        self.cpu_usage.reset()
+
         while self.is_running:
+            profiling = prof.enabled
+            if profiling:
+                prof.begin_frame()
+
             new_time = time.perf_counter()
             frame_time = new_time - current_time
             current_time = new_time
 
             accumulator += frame_time
 
-            # Run update loop
-            while accumulator >= self.dt:
-                # Run the event pump
-                self.state_manager.current_state.handle_events()
-
-                # Do update code
-                self.state_manager.current_state.update(t, self.dt)
+            # Gather the input for this frame
+            if profiling:
+                prof.begin("input")
+            self.handle_input()
+            if profiling:
+                prof.end()
 
+            # Run update loop
+            ticks = 0
+            max_ticks = self._max_ticks_per_frame()
+            while accumulator >= self.dt and ticks < max_ticks:
+                if profiling:
+                    prof.begin("update " + type(
+                        self.state_manager.current_state).__name__)
+                    prof.count_tick()
+                self.step()
+                if profiling:
+                    prof.end()
                 accumulator -= self.dt
-                t += self.dt
+                ticks += 1
             # End update loop
 
-            # Do render
-            self.state_manager.current_state.display()
-            pygame.display.flip()
+            # If we hit the catch-up limit, then throw away the whole ticks
+            # we didn't get to, so the simulation runs slow rather than
+            # never recovering
+            if accumulator >= self.dt:
+                accumulator %= self.dt
+
+            # Do render.  Alpha is how far we are between the last simulation
+            # tick and the next one, so states can interpolate between them
+            alpha = accumulator / self.dt
+            state = self.state_manager.current_state
+            if profiling:
+                prof.begin("display " + type(state).__name__)
+            state.display(alpha)
+            if profiling:
+                if prof.show_overlay:
+                    state.mark_dirty(prof.draw_overlay(self.display_window,
+                                                       self.render_scale))
+                prof.end()
+                prof.begin("present")
+            self.present()
+            if profiling:
+                prof.end()
+
+            if not self.first_frame_logged:
+                self._log_first_frame()
+            self.frame_rate.count()
+            self.cpu_usage.sample()
+
+            # Sleep until it's time for the next frame
+            if profiling:
+                prof.begin("pace")
+            self._wait_for_next_frame(new_time)
+            if profiling:
+                prof.end()
+                prof.end_frame()
 
         # End main loop
     # End method run
+
+    def run_threaded(self):
+        """An alternative main loop, with the simulation running on a thread
+        of its own.  This thread gathers the input and draws the frames, from
+        what the current state captured after the latest tick, so a slow
+        frame doesn't hold up the simulation and a burst of catch-up ticks
+        doesn't hold up the next frame.  The profiler isn't used"""
+        self.frames = TripleBuffer(self._capture_frame())
+        self.simulation_error = None
+        self.cpu_usage.reset()
+        simulation = threading.Thread(target=self._simulation_loop,
+                                      name="simulation", daemon=True)
+        simulation.start()
+
+        while self.is_running:
+            frame_start = time.perf_counter()
+            self.handle_input()
+
+            with self.state_manager.transition_lock:
+                state, frame, tick_time = self.frames.read()
+
+                # If the state has changed since the frame was captured, then
+                # the old state may have been cleaned up, so wait for the
+                # new state's first frame
+                if state is self.state_manager.current_state:
+                    alpha = min(1.0, (time.perf_counter() - tick_time)
+                                / self.dt)
+                    state.display(alpha, frame)
+                    self.present()
+
+                    if not self.first_frame_logged:
+                        self._log_first_frame()
+                    self.frame_rate.count()
+            self.cpu_usage.sample()
+
+            self._wait_for_next_frame(frame_start)
+
+        simulation.join()
+        if self.simulation_error is not None:
+            raise self.simulation_error
+    # End method run_threaded
+
+    def _max_ticks_per_frame(self):
+        """Private method returning how many ticks we'll run to catch up in
+        one frame.  A state which is idle or drawn at a reduced rate needs a
+        tick for each of the frames skipped while we waited, so that its
+        game time keeps up with the wall clock"""
+        rate = self.state_manager.current_state.animation_rate
+        if rate is None:
+            return self.max_ticks_per_frame
+        period = 1 / rate if rate else self.idle_timeout
+        return max(self.max_ticks_per_frame, math.ceil(period / self.dt))
+
+    def _wait_for_next_frame(self, frame_start):
+        """Private method which waits until it's time to start the frame
+        after the one started at frame_start.  At full speed that's up to
+        the pacer, but if the current state is idle or animating at a
+        reduced rate, then we sleep until its next frame is due and wake
+        early if any input arrives"""
+        rate = self.state_manager.current_state.animation_rate
+        if rate is None or (self.pacer.target_fps
+                            and rate >= self.pacer.target_fps):
+            self.pacer.wait()
+            return
+
+        period = 1 / rate if rate else self.idle_timeout
+        self.input.wait(frame_start + period - time.perf_counter())
+        self.pacer.reset()
+
+    def _simulation_loop(self):
+        """Private method which runs the fixed timestep simulation on its
+        own thread for run_threaded(), publishing a frame after every
+        tick"""
+        try:
+            next_tick = time.perf_counter()
+            while self.is_running:
+                now = time.perf_counter()
+                if now < next_tick:
+                    time.sleep(next_tick - now)
+                    continue
+
+                # Catch up on any ticks we're behind by, within reason
+                ticks = 0
+                while self.is_running and next_tick <= now and \
+                        ticks < self.max_ticks_per_frame:
+                    self.step()
+                    if self.is_running:
+                        self.frames.publish(self._capture_frame())
+                    next_tick += self.dt
+                    ticks += 1
+
+                # If we hit the catch-up limit, then carry on from now, so
+                # the simulation runs slow rather than never recovering
+                if next_tick <= now:
+                    next_tick = now + self.dt
+        except Exception as e:
+            # Hand the error over to the main thread to report
+            self.simulation_error = e
+            self.is_running = False
+    # End method _simulation_loop
+
+    def _capture_frame(self):
+        """Private method returning the current state, what it needs to
+        draw its next frame, and when it was captured"""
+        state = self.state_manager.current_state
+        return state, state.capture(), time.perf_counter()
 # End class Game
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Pong")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without opening a window")
+    parser.add_argument("--ticks", type=int, default=0,
+                        help="run this many fixed timesteps as fast as "
+                             "possible, then exit")
+    parser.add_argument("--render-every", type=int, default=0,
+                        help="when using --ticks, draw a frame every this "
+                             "many ticks (0 to never draw)")
+    parser.add_argument("--verbose", action="store_true",
+                        help="log startup timings and other diagnostics")
+    parser.add_argument("--tick-rate", type=float, default=60,
+                        help="simulation ticks per second.  The ball's "
+                             "collisions are exact at any rate, so this can "
+                             "be lowered to save time")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="maximum frames drawn per second (0 for no "
+                             "limit)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record the session's input to FILE")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay a recorded session headless, as fast "
+                             "as possible, checking it doesn't diverge")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each part of the frame and show the "
+                             "results on screen")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="profile, and write the last few hundred "
+                             "frames to FILE as a Chrome trace on exit")
+    parser.add_argument("--host", type=int, metavar="PORT",
+                        help="host a two player game over the network, "
+                             "listening on PORT")
+    parser.add_argument("--join", metavar="ADDRESS:PORT",
+                        help="join a network game hosted at ADDRESS:PORT")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="when playing over the network, delay every "
+                             "packet sent by this many seconds")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="vary the latency by up to this many seconds "
+                             "either way")
+    parser.add_argument("--loss", type=float, default=0.0,
+                        help="drop this fraction of the packets sent")
+    parser.add_argument("--threaded", action="store_true",
+                        help="run the simulation on a thread of its own, "
+                             "separately from drawing")
+    parser.add_argument("--render-size", metavar="WIDTHxHEIGHT",
+                        help="draw frames at this resolution (e.g. "
+                             "256x192), then scale them up to the window")
+    parser.add_argument("--scale", type=int,
+                        help="scale frames up by this whole number, "
+                             "rather than to fit the desktop")
+    parser.add_argument("--load", metavar="FILE",
+                        help="start from a game saved with --save")
+    parser.add_argument("--save", metavar="FILE",
+                        help="save the game to FILE on exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose
+                        else logging.WARNING)
+
     states = [
         {"name": "MainMenu", "file": "MainMenuState", "default": True},
         {"name": "Credits", "file": "CreditsState", "default": False},
         {"name": "MainGame", "file": "MainGameState", "default": False},
     ]
-    game = Game(states)
-    game.run()
+    replayer = ReplayPlayer(args.replay) if args.replay else None
+
+    if args.tick_rate <= 0:
+        print("The tick rate must be more than 0")
+        sys.exit(1)
+
+    render_resolution = None
+    if args.render_size:
+        try:
+            render_resolution = tuple(
+                int(n) for n in args.render_size.lower().split("x"))
+        except ValueError:
+            render_resolution = ()
+        if len(render_resolution) != 2:
+            print(f"Invalid render size {args.render_size}, expected "
+                  f"WIDTHxHEIGHT")
+            sys.exit(1)
+
+    try:
+        game = Game(states, headless=args.headless or replayer is not None,
+                    seed=replayer.seed if replayer else None,
+                    render_resolution=render_resolution,
+                    window_scale=args.scale)
+    except ValueError as e:
+        print(f"Unable to set up the display: {e}")
+        sys.exit(1)
+    game.dt = 1 / args.tick_rate
+    game.pacer.set_target_fps(args.fps)
+    game.profiler.enabled = args.profile or args.trace is not None
+
+    if args.load:
+        try:
+            game.load_game(args.load)
+        except (OSError, ValueError) as e:
+            print(f"Unable to load {args.load}: {e}")
+            sys.exit(1)
+
+    if args.record:
+        game.start_recording(args.record)
+
+    # For a network game, go straight into a two player match
+    net = None
+    if args.host or args.join:
+        link = None
+        if args.latency or args.jitter or args.loss:
+            link = LossyLink(args.latency, args.jitter, args.loss)
+        if args.host:
+            net = NetHost(args.host, link)
+        else:
+            address, _, port = args.join.rpartition(":")
+            net = NetClient((address or "127.0.0.1", int(port)), link)
+        try:
+            net.start()
+        except OSError as e:
+            print(f"Unable to open a network socket: {e}")
+            sys.exit(1)
+
+        if args.host:
+            print(f"Waiting for the other player to join on port "
+                  f"{args.host}")
+        main_game = game.state_manager.get("MainGame")
+        main_game.num_players = 2
+        main_game.net = net
+        game.state_manager.push("MainGame")
+
+    if replayer is not None:
+        game.dt = replayer.dt
+        game.replayer = replayer
+        start = time.perf_counter()
+        ran = game.simulate(replayer.ticks, args.render_every)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {ran} of {replayer.ticks} ticks in {elapsed:.3f}s "
+              f"with no divergence")
+    elif args.ticks > 0:
+        start = time.perf_counter()
+        ran = game.simulate(args.ticks, args.render_every)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated {ran} ticks ({ran * game.dt:.1f}s of game time) "
+              f"in {elapsed:.3f}s")
+    elif args.threaded:
+        game.run_threaded()
+        print(f"Simulation {game.tick_rate.rate:.1f} ticks/s, drawing "
+              f"{game.frame_rate.rate:.1f} frames/s")
+        print(f"CPU time {game.cpu_usage.average():.2f}s per second")
+    else:
+        game.run()
+        print(f"CPU time {game.cpu_usage.average():.2f}s per second")
+
+    game.stop_recording()
+
+    if args.save and game.state_manager.state_stack:
+        game.save_game(args.save)
+
+    if net is not None:
+        net.close()
+        print(f"Network: {net.stats.summary()}")
+
+    if args.trace:
+        game.profiler.export_chrome_trace(args.trace)